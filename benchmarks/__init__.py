@@ -0,0 +1,8 @@
+"""Benchmarks of request/response hot path of marnadi applications.
+
+Usage::
+
+    python -m benchmarks [--scenario NAME] [--requests N]
+                         [--dispatcher tree|regex] [--save FILE]
+                         [--compare FILE] [--threshold RATIO]
+"""
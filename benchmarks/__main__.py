@@ -0,0 +1,133 @@
+import argparse
+import gc
+import json
+import sys
+
+try:
+    import tracemalloc
+except ImportError:  # python 2.x
+    tracemalloc = None
+
+from timeit import default_timer as timer
+
+from marnadi.dispatchers import TreeDispatcher, RegexDispatcher
+from marnadi.wsgi import App
+
+from benchmarks.scenarios import scenarios
+
+dispatchers = {
+    'tree': TreeDispatcher,
+    'regex': RegexDispatcher,
+}
+
+
+def start_response(status, headers):
+    pass
+
+
+def request(app, environ):
+    for _ in app(environ, start_response):
+        pass
+
+
+def measure_speed(app, make_environ, requests, repeat=3):
+    """Return best requests per second rate of `repeat` runs."""
+    for _ in range(max(requests // 10, 1)):  # warm up
+        request(app, make_environ())
+    best = 0
+    for _ in range(repeat):
+        environs = [make_environ() for _ in range(requests)]
+        gc.collect()
+        started = timer()
+        for environ in environs:
+            request(app, environ)
+        best = max(best, requests / (timer() - started))
+    return best
+
+
+def measure_memory(app, make_environ, requests):
+    """Return average peak of memory allocated during request (bytes)."""
+    if tracemalloc is None or not hasattr(tracemalloc, 'reset_peak'):
+        return None
+    environs = [make_environ() for _ in range(requests)]
+    total = 0
+    tracemalloc.start()
+    try:
+        for environ in environs:
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            request(app, environ)
+            total += tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    return total // requests
+
+
+def run(names, requests, repeat=3, dispatcher=None):
+    results = {}
+    for name in names:
+        routes, make_environ = scenarios[name]()
+        app = App(routes=routes, dispatcher=dispatcher)
+        results[name] = dict(
+            rps=measure_speed(app, make_environ, requests, repeat=repeat),
+            memory=measure_memory(app, make_environ, max(requests // 10, 1)),
+        )
+    return results
+
+
+def report(results, baseline=None, threshold=0.1):
+    """Print results and return names of regressed scenarios."""
+    regressions = []
+    for name in sorted(results):
+        result = results[name]
+        line = '{name:<20} {rps:>12.0f} req/s'.format(name=name, **result)
+        if result['memory'] is not None:
+            line += ' {memory:>10d} B/req'.format(**result)
+        if baseline and name in baseline:
+            ratio = result['rps'] / baseline[name]['rps'] - 1
+            line += ' {ratio:>+8.1%}'.format(ratio=ratio)
+            if ratio < -threshold:
+                line += ' REGRESSION'
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--scenario', action='append',
+                        choices=sorted(scenarios),
+                        help="scenario to run (default: all)")
+    parser.add_argument('--requests', type=int, default=10000,
+                        help="number of requests per scenario run")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="number of runs, the best one is reported")
+    parser.add_argument('--dispatcher', choices=sorted(dispatchers),
+                        help="compiled dispatcher used by application")
+    parser.add_argument('--save', metavar='FILE',
+                        help="save results to FILE as JSON")
+    parser.add_argument('--compare', metavar='FILE',
+                        help="compare results with previously saved ones")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="allowed slowdown ratio when comparing")
+    args = parser.parse_args(args)
+
+    results = run(
+        args.scenario or sorted(scenarios),
+        requests=args.requests,
+        repeat=args.repeat,
+        dispatcher=dispatchers.get(args.dispatcher),
+    )
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    regressions = report(results, baseline, threshold=args.threshold)
+    if args.save:
+        with open(args.save, 'w') as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
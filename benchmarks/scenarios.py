@@ -0,0 +1,130 @@
+import io
+import json
+
+from marnadi import Response, Route
+
+scenarios = {}
+
+
+def scenario(func):
+    """Register function returning (routes, make_environ) tuple."""
+    scenarios[func.__name__] = func
+    return func
+
+
+def make_environ(path, method='GET', body=b'', **environ):
+    environ.update(
+        REQUEST_METHOD=method,
+        PATH_INFO=path,
+        QUERY_STRING='',
+        SERVER_NAME='localhost',
+        SERVER_PORT='80',
+        SERVER_PROTOCOL='HTTP/1.1',
+    )
+    environ['wsgi.input'] = io.BytesIO(body)
+    return environ
+
+
+@Response.provider
+def hello(**kwargs):
+    return 'hello'
+
+
+@scenario
+def simple_routes():
+    routes = [Route('/route%d' % index, hello) for index in range(10)]
+    return routes, lambda: make_environ('/route9')
+
+
+@scenario
+def nested_routes():
+    routes = (Route('/leaf', hello), )
+    for level in range(5, 0, -1):
+        routes = (
+            Route('/other%d' % level, hello),
+            Route('/level%d' % level, routes),
+        )
+    path = '/level1/level2/level3/level4/level5/leaf'
+    return routes, lambda: make_environ(path)
+
+
+@scenario
+def placeholder_routes():
+    routes = [
+        Route('/items%d/{item_id}' % index, hello)
+        for index in range(200)
+    ]
+    return routes, lambda: make_environ('/items199/12345')
+
+
+class HeadersResponse(Response):
+
+    def get(self):
+        headers = self.request.headers
+        return headers['User-Agent'] + headers['Accept'] + headers['Host']
+
+
+@scenario
+def headers():
+    environ = {
+        'HTTP_X_CUSTOM_HEADER_%d' % index: 'value%d' % index
+        for index in range(30)
+    }
+    environ.update(
+        HTTP_USER_AGENT='benchmark',
+        HTTP_ACCEPT='*/*',
+        HTTP_HOST='localhost',
+    )
+    routes = (Route('/', HeadersResponse), )
+    return routes, lambda: make_environ('/', **environ)
+
+
+class CookiesResponse(Response):
+
+    def get(self):
+        return self.cookies.get('session', '')
+
+
+@scenario
+def cookies():
+    cookie = '; '.join(
+        'cookie%d=%s' % (index, 'x' * 40)
+        for index in range(50)
+    ) + '; session=foo'
+    routes = (Route('/', CookiesResponse), )
+    return routes, lambda: make_environ('/', HTTP_COOKIE=cookie)
+
+
+class JsonResponse(Response):
+
+    def post(self):
+        return str(len(self.request.data))
+
+
+@scenario
+def json_body():
+    body = json.dumps([
+        {'id': index, 'name': 'item%d' % index, 'tags': ['a', 'b']}
+        for index in range(200)
+    ]).encode('utf-8')
+    routes = (Route('/', JsonResponse), )
+    return routes, lambda: make_environ(
+        '/',
+        method='POST',
+        body=body,
+        CONTENT_TYPE='application/json',
+        CONTENT_LENGTH=str(len(body)),
+    )
+
+
+class StreamResponse(Response):
+
+    def get(self):
+        for index in range(100):
+            yield 'chunk%d\n' % index
+
+
+@scenario
+def streamed_response():
+    routes = (Route('/', StreamResponse), )
+    return routes, lambda: make_environ('/')
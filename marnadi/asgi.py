@@ -0,0 +1,179 @@
+"""ASGI entry point (requires Python 3.6+)."""
+
+import inspect
+import io
+import sys
+
+from marnadi import wsgi
+from marnadi.errors import HttpError
+from marnadi.instrumentation import Timing, complete, timer
+from marnadi.utils import to_bytes
+
+
+class App(wsgi.App):
+    """ASGI application class.
+
+    Uses the same routes, responses and descriptors as WSGI :class:`App`.
+    Handler methods may be defined with `async def`, also they may return
+    asynchronous iterables to stream response body.
+
+    Note:
+        Request body is read entirely before the handler is called, then
+        it's available as `wsgi.input` of request as usual.
+
+        Collectors are notified the same way as by WSGI application,
+        the body is complete when its last message is sent. Response
+        stats are recorded for synchronous results of handlers only.
+    """
+
+    __slots__ = ()
+
+    asynchronous = True
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError("Unsupported scope type: %s" % scope['type'])
+        environ = self.make_environ(scope, await self.read_body(receive))
+        collectors = self.collectors
+        timing = Timing(environ, application=self) if collectors else None
+        for collector in collectors:
+            collector.pre_dispatch(timing)
+        try:
+            request = self.make_request_object(environ)
+            try:
+                response, first_chunk, chunks = await self.get_response(
+                    request, timing=timing)
+            except HttpError as error:
+                response, first_chunk, chunks = error, b''.join(error), ()
+            if timing is not None:
+                timing.first_byte = timer()
+                timing.status = response.status
+                timing.stats = getattr(response, 'stats', None)
+                for collector in collectors:
+                    collector.first_byte(timing)
+            await self.send_response(send, response, first_chunk, chunks)
+        finally:
+            if timing is not None:
+                complete(timing, collectors)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        return b''.join(chunks)
+
+    @staticmethod
+    def make_environ(scope, body):
+        server_name, server_port = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'],
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+            'SERVER_NAME': server_name,
+            'SERVER_PORT': str(server_port),
+            'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'asgi.scope': scope,
+        }
+        for name, value in scope.get('headers', ()):
+            name = name.decode('latin1').upper().replace('-', '_')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = 'HTTP_' + name
+            value = value.decode('latin1')
+            if name in environ:  # join repeated headers
+                value = environ[name] + ',' + value
+            environ[name] = value
+        return environ
+
+    async def get_response(self, request, timing=None):
+        """Return response, first chunk of its body and the rest chunks.
+
+        Rest chunks may be either iterator or asynchronous iterator.
+        Collectors are notified of dispatch if `timing` is given.
+
+        Note:
+            Response is started by :meth:`Handler.start` as WSGI
+            application does it, so its error handling and response cache
+            apply. Asynchronous result of the handler is completed here,
+            errors raised meanwhile are thrown into `start` coroutine.
+        """
+        start = self.get_handler(request.path)
+        if timing is not None:
+            timing.dispatched = timer()
+            timing.route = self.get_route_name(getattr(start, 'route', None))
+            for collector in self.collectors:
+                collector.post_dispatch(timing)
+        response = start.send((self, request))
+        result = getattr(response, 'async_result', None)
+        if result is None:
+            chunks = iter(response)
+            return response, next(chunks, b''), chunks
+        response.async_result = None
+        if getattr(response, 'stats', None) is not None:
+            response.stats = None  # only creation of the result is measured
+            response.headers.clear('Server-Timing')
+        try:
+            if inspect.isawaitable(result):
+                result = await result
+            if hasattr(result, '__aiter__'):
+                chunks = result.__aiter__()
+                try:
+                    first_chunk = to_bytes(await chunks.__anext__())
+                except StopAsyncIteration:
+                    first_chunk = b''
+            else:
+                chunks = response.compress_chunks(response.iterate(result))
+                first_chunk = next(chunks)
+        except Exception as error:
+            start.throw(error)
+            raise  # error wasn't handled by `start`
+        return response, first_chunk, chunks
+
+    @staticmethod
+    async def send_response(send, response, first_chunk, chunks):
+        await send({
+            'type': 'http.response.start',
+            'status': int(response.status.split(' ', 1)[0]),
+            'headers': [
+                (name.encode('latin1'), value.encode('latin1'))
+                for name, value in response.headers.items(stringify=True)
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': first_chunk,
+            'more_body': True,
+        })
+        if hasattr(chunks, '__anext__'):
+            async for chunk in chunks:
+                await send({
+                    'type': 'http.response.body',
+                    'body': to_bytes(chunk),
+                    'more_body': True,
+                })
+        else:
+            for chunk in chunks:
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body', 'body': b''})
@@ -0,0 +1,278 @@
+import threading
+import time
+
+from marnadi.descriptors.headers import ResponseHeaders
+from marnadi.utils import LRUCache
+
+
+class CachedResponse(object):
+    """Complete response (status, headers and body) kept by the cache.
+
+    Headers describing the particular request (`skip_headers`, e.g.
+    `Server-Timing`) aren't kept, they are sent only with the response
+    which has been stored.
+    """
+
+    __slots__ = 'status', 'headers', 'body', 'expires', 'handler'
+
+    skip_headers = frozenset(('Server-Timing', ))
+
+    def __init__(self, status, headers, body, expires=None, handler=None):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+        self.handler = handler
+
+    def __iter__(self):
+        yield self.body
+
+    @classmethod
+    def from_response(cls, response, body, expires=None, skip_headers=None):
+        if skip_headers is None:
+            skip_headers = cls.skip_headers
+        headers = {}
+        for header, value in response.headers.items(stringify=True):
+            if header.title() not in skip_headers:
+                headers.setdefault(header, []).append(value)
+        headers['Content-Length'] = [str(len(body))]
+        headers = {
+            header: tuple(values)
+            for header, values in headers.items()
+        }
+        return cls(
+            status=response.status,
+            headers=ResponseHeaders(headers, headers),
+            body=body,
+            expires=expires,
+            handler=type(response),
+        )
+
+
+class PassedResponse(object):
+    """Response which turned out too large to be cached.
+
+    Already read chunks are sent first, the rest of the body is passed
+    through without buffering.
+    """
+
+    __slots__ = 'response', 'chunks', 'rest_chunks'
+
+    def __init__(self, response, chunks, rest_chunks):
+        self.response = response
+        self.chunks = chunks
+        self.rest_chunks = rest_chunks
+
+    def __iter__(self):
+        chunks, self.chunks = self.chunks, ()
+        for chunk in chunks:
+            yield chunk
+        for chunk in self.rest_chunks:
+            yield chunk
+
+    @property
+    def status(self):
+        return self.response.status
+
+    @property
+    def headers(self):
+        return self.response.headers
+
+    @property
+    def handler(self):
+        return type(self.response)
+
+
+class Flight(object):
+    """Computation of the response which concurrent requests wait for."""
+
+    __slots__ = 'event', 'response'
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+
+
+class ResponseCache(object):
+    """In-memory cache of complete responses of idempotent handlers.
+
+    Cache is declared by `response_cache` attribute of the handler.
+    Responses are keyed by handler, request method, URL params, query
+    string and values of `vary` request headers. Only `200 OK` responses
+    not larger than `max_body_size` and not setting cookies are stored,
+    at most `size` of them are kept for `ttl` seconds. Responses which
+    `Vary` header lists request headers missing in `vary` aren't stored,
+    `Accept-Encoding` is added to `vary` of handlers compressing bodies.
+    Requests with `Range` or conditional headers bypass the cache, as well
+    as requests with credentials (`private_headers`) unless they are
+    listed by `vary`.
+
+    Concurrent misses of the same key are coalesced: only one of them
+    calls the handler, the rest wait (at most `wait_timeout` seconds) and
+    share its buffered response.
+
+    Args:
+        ttl (float): time to live of cached response in seconds.
+        size (int): max number of cached responses.
+        vary (tuple): names of request headers distinguishing responses
+            (e.g. `Accept-Language`).
+        max_body_size (int): max size of cached body in bytes.
+        wait_timeout (float): max time in seconds to wait for response
+            being computed by concurrent request, the response is computed
+            independently after that.
+    """
+
+    __slots__ = ('ttl', 'vary', 'max_body_size', 'wait_timeout', 'entries',
+                 '_flights', '_lock', '__weakref__')
+
+    methods = frozenset(('GET', 'HEAD'))
+
+    bypass_headers = (
+        'Range', 'If-Match', 'If-None-Match',
+        'If-Modified-Since', 'If-Unmodified-Since',
+    )
+
+    private_headers = 'Authorization', 'Cookie'
+
+    timer = staticmethod(getattr(time, 'monotonic', time.time))
+
+    def __init__(
+        self,
+        ttl=60,
+        size=128,
+        vary=(),
+        max_body_size=1024 * 1024,
+        wait_timeout=10,
+    ):
+        self.ttl = ttl
+        self.vary = tuple(header.title() for header in vary)
+        self.max_body_size = max_body_size
+        self.wait_timeout = wait_timeout
+        self.entries = LRUCache(size)
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, handler, request, params):
+        """Return cache key for the request or None if it's not cacheable."""
+        if request.method not in self.methods:
+            return None
+        headers = request.headers
+        for header in self.bypass_headers:
+            if header in headers:
+                return None
+        vary = self.get_vary(handler)
+        for header in self.private_headers:
+            if header in headers and header not in vary:
+                return None
+        try:
+            key = (
+                handler,
+                request.method,
+                frozenset(params.items()),
+                request.get('QUERY_STRING', ''),
+                tuple(headers.get(header) for header in vary),
+            )
+            hash(key)
+        except TypeError:  # unhashable params
+            return None
+        return key
+
+    def get_vary(self, handler):
+        """Return names of request headers distinguishing responses."""
+        if getattr(handler, 'compress', False):
+            if 'Accept-Encoding' not in self.vary:
+                return self.vary + ('Accept-Encoding', )
+        return self.vary
+
+    def get(self, key):
+        """Return cached response or None if it's missing or expired."""
+        response = self.entries.get(key)
+        if response is None:
+            return None
+        if response.expires <= self.timer():
+            self.entries.pop(key)
+            return None
+        return response
+
+    def set(self, key, response):
+        """Read the response and store it if possible.
+
+        Body is read only while it fits `max_body_size`, larger bodies are
+        passed through.
+
+        Returns:
+            Response which must be used instead of the given one - either
+            :class:`CachedResponse` or the response which can't be cached.
+        """
+        if not self.is_cacheable(response):
+            return response
+        max_body_size = self.max_body_size
+        content_length = response.headers.get('Content-Length')
+        if (
+            content_length and max_body_size is not None and
+            int(content_length[0]) > max_body_size
+        ):
+            return response  # e.g. file may still be passed to the server
+        chunks, size = [], 0
+        rest_chunks = iter(response)
+        for chunk in rest_chunks:
+            chunks.append(chunk)
+            size += len(chunk)
+            if max_body_size is not None and size > max_body_size:
+                return PassedResponse(response, chunks, rest_chunks)
+        body = b''.join(chunks)
+        expires = self.timer() + self.ttl
+        self.entries.set(key, CachedResponse.from_response(
+            response, body=body, expires=expires))
+        return CachedResponse.from_response(  # with headers of this request
+            response, body=body, expires=expires, skip_headers=())
+
+    def is_cacheable(self, response):
+        """Whether response may be shared with other clients."""
+        if (
+            response.status != '200 OK' or
+            'Set-Cookie' in response.headers or
+            getattr(response, 'async_result', None) is not None
+        ):
+            return False
+        vary = self.get_vary(type(response))
+        for value in response.headers.get('Vary', ()):
+            for header in str(value).split(','):
+                if header.strip().title() not in vary:
+                    return False  # also '*'
+        return True
+
+    def get_or_set(self, key, get_response):
+        """Return cached response or store one returned by `get_response`.
+
+        Only one of concurrent callers missing the same key calls
+        `get_response`, the rest get its result if it's cacheable.
+        """
+        response = self.get(key)
+        if response is not None:
+            return response
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+        if not leader:
+            flight.event.wait(self.wait_timeout)
+            if flight.response is not None:
+                return flight.response
+            # timeout or error of the leader, compute response independently
+            return self.set(key, get_response())
+        try:
+            response = self.get(key)  # may be stored by the previous flight
+            if response is None:
+                response = self.set(key, get_response())
+            if isinstance(response, CachedResponse):
+                flight.response = self.get(key)  # without request headers
+            return response
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+    def clear(self):
+        self.entries.clear()
@@ -1,10 +1,87 @@
+import calendar
 import collections
 import copy
 import datetime
 import time
 import weakref
 
-from marnadi.utils import cached_property, CachedDescriptor
+from marnadi.utils import cached_property, CachedDescriptor, http_date
+
+
+class RequestCookies(collections.MutableMapping):
+    """Cookies of request - lazily parsed dict-like object.
+
+    `Cookie` header is scanned in a single pass only until the requested
+    cookie is found, the rest is parsed on demand. Malformed pairs are
+    skipped, quotes around values are removed. If cookie is repeated the
+    first value is used.
+    """
+
+    if hasattr(collections.MutableMapping, '__slots__'):
+        __slots__ = '_header', '_position', '_cookies', '__weakref__'
+
+    def __init__(self, header=''):
+        self._header = header
+        self._position = 0
+        self._cookies = {}
+
+    __hash__ = object.__hash__
+
+    __eq__ = object.__eq__
+
+    __ne__ = object.__ne__
+
+    def __getitem__(self, cookie):
+        try:
+            return self._cookies[cookie]
+        except KeyError:
+            if self._parse(until=cookie):
+                return self._cookies[cookie]
+            raise
+
+    def __setitem__(self, cookie, value):
+        self._parse()
+        self._cookies[cookie] = value
+
+    def __delitem__(self, cookie):
+        self._parse()
+        del self._cookies[cookie]
+
+    def __iter__(self):
+        self._parse()
+        return iter(self._cookies)
+
+    def __len__(self):
+        self._parse()
+        return len(self._cookies)
+
+    def _parse(self, until=None):
+        """Parse header till the end or `until` cookie is found.
+
+        Returns:
+            True if `until` cookie has been found.
+        """
+        header, position, cookies = self._header, self._position, self._cookies
+        length = len(header)
+        while position < length:
+            end = header.find(';', position)
+            if end < 0:
+                end = length
+            pair = header[position:end]
+            position = end + 1
+            name, separator, value = pair.partition('=')
+            name = name.strip()
+            if not separator or not name or name in cookies:
+                continue  # malformed or repeated pair
+            value = value.strip()
+            if len(value) > 1 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+            cookies[name] = value
+            if name == until:
+                self._position = position
+                return True
+        self._position = length
+        return False
 
 
 class CookieJar(collections.MutableMapping):
@@ -12,16 +89,21 @@ class CookieJar(collections.MutableMapping):
 
     if hasattr(collections.MutableMapping, '__slots__'):
         __slots__ = ('_response', 'domain', 'path', 'expires', 'secure',
-                     'http_only', '__weakref__')
+                     'http_only', '_request_cookies', '_suffix',
+                     '__weakref__')
 
     def __init__(self, response, domain=None, path=None, expires=None,
-                 secure=False, http_only=True, ):
+                 secure=False, http_only=True, suffix=None):
         self._response = weakref.ref(response)
         self.domain = domain
         self.path = path
         self.expires = expires
         self.secure = secure
         self.http_only = http_only
+        key = domain, path, secure, http_only
+        if suffix is None or suffix[0] != key:
+            suffix = key, self.render_attributes(*key)
+        self._suffix = suffix  # (attributes, rendered attributes)
 
     __hash__ = object.__hash__
 
@@ -56,15 +138,12 @@ class CookieJar(collections.MutableMapping):
             return response
         raise ValueError("CookieJar used outside of response scope")
 
-    @cached_property
+    @cached_property.in_slot('_request_cookies')
     def request_cookies(self):
         try:
-            return dict(
-                cookie.strip().split('=', 1)
-                for cookie in self.response.request.headers['Cookie'].split(';')
-            )
-        except (KeyError, ValueError):
-            return {}
+            return RequestCookies(self.response.request.headers['Cookie'])
+        except KeyError:
+            return RequestCookies()
 
     def clear(self, *cookies):
         if cookies:
@@ -89,41 +168,57 @@ class CookieJar(collections.MutableMapping):
         secure = self.secure if secure is None else secure
         http_only = self.http_only if http_only is None else http_only
 
-        cookie_params = ['%s=%s' % (cookie, value)]
-        domain is not None and cookie_params.append("Domain=%s" % domain)
-        path is not None and cookie_params.append("Path=%s" % path)
+        key = domain, path, secure, http_only
+        suffix_key, suffix = self._suffix
+        if key != suffix_key:  # attributes differ from the defaults
+            suffix = self.render_attributes(*key)
         if expires is not None:
-            try:
-                # try to use `expires` as timedelta
-                expires += datetime.datetime.now()
-            except TypeError:
-                pass
-            if isinstance(expires, datetime.datetime):
-                struct_time = (
-                    time.gmtime(time.mktime(expires.timetuple()))
-                    if expires.tzinfo is None else
-                    time.localtime(time.mktime(expires.utctimetuple()))
-                )
-                expires = time.strftime("%a, %d %b %Y %H:%M:%S GMT",
-                                        struct_time)
-            cookie_params.append("Expires=%s" % expires)
-        secure and cookie_params.append("Secure")
-        http_only and cookie_params.append("HttpOnly")
-        self.response.headers.append('Set-Cookie', '; '.join(cookie_params))
+            suffix = '; Expires=%s%s' % (self.format_expires(expires), suffix)
+        self.response.headers.append(
+            'Set-Cookie', '%s=%s%s' % (cookie, value, suffix))
+
+    @staticmethod
+    def render_attributes(domain, path, secure, http_only):
+        """Return `Set-Cookie` attributes following cookie's value."""
+        attributes = []
+        domain is not None and attributes.append("; Domain=%s" % domain)
+        path is not None and attributes.append("; Path=%s" % path)
+        secure and attributes.append("; Secure")
+        http_only and attributes.append("; HttpOnly")
+        return ''.join(attributes)
+
+    @staticmethod
+    def format_expires(expires):
+        if isinstance(expires, datetime.timedelta):
+            return http_date(time.time() + expires.total_seconds())
+        if isinstance(expires, datetime.datetime):
+            return http_date(
+                time.mktime(expires.timetuple())
+                if expires.tzinfo is None else
+                calendar.timegm(expires.utctimetuple())
+            )
+        return expires
 
 
 class Cookies(CachedDescriptor):
+    """Descriptor providing :class:`CookieJar` with given defaults.
+
+    Default attributes of `Set-Cookie` are rendered once on descriptor
+    creation.
+    """
 
-    __slots__ = 'domain', 'path', 'expires', 'secure', 'http_only'
+    __slots__ = 'domain', 'path', 'expires', 'secure', 'http_only', 'suffix'
 
     def __init__(self, domain=None, path=None, expires=None, secure=False,
-                 http_only=True):
-        super(Cookies, self).__init__()
+                 http_only=True, slot=None):
+        super(Cookies, self).__init__(slot=slot)
         self.domain = domain
         self.path = path
         self.expires = expires
         self.secure = secure
         self.http_only = http_only
+        key = domain, path, secure, http_only
+        self.suffix = key, CookieJar.render_attributes(*key)
 
     def get_value(self, response):
         return CookieJar(
@@ -133,4 +228,5 @@ class Cookies(CachedDescriptor):
             expires=copy.copy(self.expires),
             secure=self.secure,
             http_only=self.http_only,
+            suffix=self.suffix,
         )
@@ -7,11 +7,18 @@ from . import decoders
 
 
 class Data(CachedDescriptor, collections.Mapping):
+    """Request data decoded according to its content type.
+
+    Descriptor may be declared by :class:`Response` subclass to override
+    content decoders for particular handler, e.g. to use
+    `marnadi.descriptors.data.decoders.application.json.StreamDecoder`.
+    """
 
     __slots__ = '_content_decoders',
 
     def __init__(self, *content_decoders, **kw_content_decoders):
-        super(Data, self).__init__()
+        super(Data, self).__init__(
+            slot=kw_content_decoders.pop('slot', None))
         self._content_decoders = {
             content_type: Lazy(content_decoder)
             for content_type, content_decoder in itertools.chain(
@@ -29,6 +36,7 @@ class Data(CachedDescriptor, collections.Mapping):
     def __len__(self):
         return len(self._content_decoders)
 
-    def get_value(self, request):
+    def get_value(self, instance):
+        request = getattr(instance, 'request', instance)
         decoder = self.get(request.content_type.value, decoders.Decoder)
         return decoder(request)
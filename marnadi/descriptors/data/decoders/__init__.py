@@ -10,8 +10,53 @@ class DecoderType(type):
 
 @metaclass(DecoderType)
 class Decoder(object):
+    """Base decoder returning raw request body.
+
+    Body is read by chunks of `chunk_size` bytes but not more than request
+    content length, memory is taken only for data actually received.
+    `HttpError` with 413 status is raised if body is larger than `max_size`
+    bytes (unlimited if None).
+    """
 
     __slots__ = ()
 
+    chunk_size = 64 * 1024
+
+    max_size = 10 * 1024 * 1024
+
     def __call__(self, request):
-        return b''.join(request.input)
+        return self.read_body(request)
+
+    def check_size(self, size):
+        if self.max_size is not None and size > self.max_size:
+            from marnadi.errors import HttpError
+            raise HttpError('413 Request Entity Too Large')
+
+    def get_content_length(self, request):
+        try:
+            content_length = request.content_length
+        except AttributeError:  # body is read until EOF
+            return None
+        self.check_size(content_length)
+        return content_length
+
+    def read_chunks(self, request):
+        stream = request.input
+        remaining = self.get_content_length(request)
+        received = 0
+        while remaining is None or remaining > 0:
+            size = self.chunk_size
+            if remaining is not None:
+                size = min(size, remaining)
+            chunk = stream.read(size)
+            if not chunk:
+                break
+            if remaining is None:
+                received += len(chunk)
+                self.check_size(received)
+            else:
+                remaining -= len(chunk)
+            yield chunk
+
+    def read_body(self, request):
+        return b''.join(self.read_chunks(request))
@@ -1,4 +1,6 @@
+import codecs
 import importlib
+import itertools
 json = importlib.import_module('json')  # import built-in module 'json'
 
 from marnadi.descriptors.data.decoders import Decoder as BaseDecoder
@@ -6,18 +8,89 @@ from marnadi.descriptors.data.decoders import Decoder as BaseDecoder
 
 class Decoder(BaseDecoder):
 
-    __slots__ = ('stream', 'encoding')
+    __slots__ = ()
 
-    def __init__(self):
-        self.encoding = None
-        self.stream = None
+    def __call__(self, request):
+        encoding = request.content_type.params.get('charset', 'utf-8')
+        return json.loads(self.read_body(request).decode(encoding))
+
+
+class StreamDecoder(BaseDecoder):
+    """Decoder returning iterator over items of top-level JSON array.
+
+    Request body is read by chunks, so only the current item is kept in
+    memory. Items are decoded one by one while iterator is consumed.
+    """
+
+    __slots__ = ()
+
+    whitespace = ' \t\n\r'
+
+    number_chars = '0123456789.eE+-'
 
     def __call__(self, request):
-        self.encoding = request.content_type.params.get('charset', 'utf-8')
-        self.stream = request.input
-        return json.load(self)
-
-    def read(self, *args, **kwargs):
-        assert self.encoding and self.stream, \
-            "Either stream or encoding is not provided"
-        return self.stream.read(*args, **kwargs).decode(encoding=self.encoding)
+        encoding = request.content_type.params.get('charset', 'utf-8')
+        return self.iterate(self.read_chunks(request), encoding)
+
+    def iterate(self, chunks, encoding):
+        decode_chunk = codecs.getincrementaldecoder(encoding)().decode
+        decode_item = json.JSONDecoder().raw_decode
+        whitespace = self.whitespace
+        buffer, position, state = '', 0, '['
+        for chunk in itertools.chain(chunks, (None, )):
+            eof = chunk is None
+            buffer = buffer[position:] + decode_chunk(chunk or b'', eof)
+            position = 0
+            while True:
+                while (position < len(buffer) and
+                       buffer[position] in whitespace):
+                    position += 1
+                if position == len(buffer) or state == 'end':
+                    break
+                char = buffer[position]
+                if state == '[':
+                    if char != '[':
+                        raise ValueError("JSON array expected")
+                    position += 1
+                    state = 'first'
+                elif state == 'first' and char == ']':
+                    position += 1
+                    state = 'end'
+                elif state in ('first', 'item'):
+                    try:
+                        item, end = decode_item(buffer, position)
+                    except ValueError:
+                        if eof:
+                            raise
+                        break  # item is incomplete, need more data
+                    if not eof and self.is_incomplete(buffer, position, end):
+                        break  # item may be continued by the next chunk
+                    position = end
+                    state = 'separator'
+                    yield item
+                elif char == ',':
+                    position += 1
+                    state = 'item'
+                elif char == ']':
+                    position += 1
+                    state = 'end'
+                else:
+                    raise ValueError("',' or ']' expected")
+            if state == 'end':
+                return
+        raise ValueError("Unexpected end of JSON array")
+
+    def is_incomplete(self, buffer, start, end):
+        """Whether item decoded from buffer[start:end] may be continued.
+
+        Number is decoded from its longest valid prefix, so it's complete
+        only if it's followed by the char which can't belong to number.
+        """
+        if end == len(buffer):
+            return True
+        if buffer[start] not in '-0123456789':
+            return False
+        number_chars = self.number_chars
+        while end < len(buffer) and buffer[end] in number_chars:
+            end += 1
+        return end == len(buffer)
@@ -3,9 +3,18 @@ try:
 except ImportError:
     import urlparse as parse
 
+from marnadi.descriptors.data.decoders import Decoder as BaseDecoder
 
-def decoder(request):
-    return dict(parse.parse_qsl(
-        b''.join(request.input),
-        keep_blank_values=True,
-    ))
+
+class Decoder(BaseDecoder):
+
+    __slots__ = ()
+
+    def __call__(self, request):
+        return dict(parse.parse_qsl(
+            self.read_body(request),
+            keep_blank_values=True,
+        ))
+
+
+decoder = Decoder  # backward compatibility
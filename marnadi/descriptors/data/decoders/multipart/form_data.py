@@ -0,0 +1,233 @@
+import collections
+import itertools
+import re
+import tempfile
+
+from marnadi.descriptors.data.decoders import Decoder as BaseDecoder
+from marnadi.errors import HttpError
+
+
+class FilePart(object):
+    """Uploaded file - part of multipart data having filename.
+
+    Content of the file is available by `file` attribute which is a file
+    object positioned at the beginning.
+    """
+
+    __slots__ = 'name', 'filename', 'content_type', 'file', 'size'
+
+    def __init__(self, name, filename, content_type, file):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.file = file
+        self.size = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.size += len(data)
+
+    def close(self):
+        self.file.seek(0)
+        return self
+
+    def discard(self):
+        self.file.close()
+
+
+class FieldPart(object):
+
+    __slots__ = 'name', 'chunks', 'size'
+
+    def __init__(self, name):
+        self.name = name
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.size += len(data)
+
+    def close(self):
+        return b''.join(self.chunks)
+
+    def discard(self):
+        pass
+
+
+class FormData(collections.Mapping):
+    """Multi-value dict-like object of parsed multipart data.
+
+    Item access returns the last value of the field, all of them (e.g.
+    files of `<input type="file" multiple>`) are returned by
+    :meth:`getall`.
+    """
+
+    if hasattr(collections.Mapping, '__slots__'):
+        __slots__ = '_fields',
+
+    def __init__(self, fields=()):
+        self._fields = {}
+        for name, value in fields:
+            self.add(name, value)
+
+    def __getitem__(self, name):
+        return self._fields[name][-1]
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def add(self, name, value):
+        self._fields.setdefault(name, []).append(value)
+
+    def getall(self, name):
+        """Return list of all values of the field."""
+        return list(self._fields.get(name, ()))
+
+    def close(self):
+        """Close files of all uploaded :class:`FilePart`."""
+        for values in self._fields.values():
+            for value in values:
+                if isinstance(value, FilePart):
+                    value.discard()
+
+
+class Decoder(BaseDecoder):
+    """Streaming multipart/form-data decoder.
+
+    Body is parsed while it is read by chunks and returned as
+    :class:`FormData`. Values of fields are
+    returned as bytes, files are returned as :class:`FilePart` which
+    content is kept in memory up to `spool_size` bytes and spooled to
+    temporary file beyond that. `HttpError` with 413 status is raised if
+    part is larger than `max_field_size` (or `max_file_size` for files).
+    Since files are not kept in memory, the whole body is limited by larger
+    `max_size` than other decoders use.
+    """
+
+    __slots__ = ()
+
+    max_size = 100 * 1024 * 1024
+
+    spool_size = 1024 * 1024
+
+    max_field_size = 1024 * 1024
+
+    max_file_size = None
+
+    max_header_size = 16 * 1024
+
+    param_re = re.compile(
+        r';\s*([^\s=;]+)\s*=\s*(?:"((?:[^"\\]|\\.)*)"|([^;]*))',
+    )
+
+    def __call__(self, request):
+        boundary = request.content_type.params.get('boundary', '').strip('"')
+        if not boundary:
+            raise HttpError('400 Bad Request', data="Boundary is not provided")
+        form_data = FormData()
+        try:
+            for name, value in self.parse(
+                self.read_chunks(request),
+                boundary.encode('latin1'),
+            ):
+                form_data.add(name, value)
+        except Exception:
+            form_data.close()
+            raise
+        return form_data
+
+    def parse(self, chunks, boundary):
+        delimiter = b'\r\n--' + boundary
+        tail_size = len(delimiter) - 1  # delimiter may be split by chunks
+        buffer, state, part = b'\r\n', 'preamble', None
+        try:
+            for chunk in itertools.chain(chunks, (None, )):
+                if chunk is not None:
+                    buffer += chunk
+                while True:
+                    if state in ('preamble', 'body'):
+                        index = buffer.find(delimiter)
+                        if index < 0:
+                            flush_size = len(buffer) - tail_size
+                            if flush_size > 0:
+                                if part is not None:
+                                    self.write_part(part, buffer[:flush_size])
+                                buffer = buffer[flush_size:]
+                            break
+                        if part is not None:
+                            self.write_part(part, buffer[:index])
+                            yield part.name, part.close()
+                            part = None
+                        buffer = buffer[index + len(delimiter):]
+                        state = 'boundary'
+                    elif state == 'boundary':
+                        if len(buffer) < 2:
+                            break
+                        if buffer.startswith(b'--'):
+                            return
+                        if not buffer.startswith(b'\r\n'):
+                            raise HttpError(
+                                '400 Bad Request',
+                                data="Malformed multipart boundary",
+                            )
+                        buffer = buffer[2:]
+                        state = 'headers'
+                    else:  # headers
+                        index = buffer.find(b'\r\n\r\n')
+                        if index < 0:
+                            if len(buffer) > self.max_header_size:
+                                raise HttpError(
+                                    '413 Request Entity Too Large',
+                                    data="Multipart headers are too large",
+                                )
+                            break
+                        part = self.make_part(buffer[:index])
+                        buffer = buffer[index + 4:]
+                        state = 'body'
+            raise HttpError('400 Bad Request',
+                            data="Unexpected end of multipart data")
+        finally:
+            if part is not None:  # error or parsing was interrupted
+                part.discard()
+
+    def parse_header_value(self, value):
+        """Return value and params of header, e.g. Content-Disposition."""
+        value, _, params = value.partition(';')
+        return value.strip(), {
+            name.lower(): quoted.replace('\\"', '"') if quoted else plain
+            for name, quoted, plain in self.param_re.findall(';' + params)
+        }
+
+    def make_part(self, raw_headers):
+        headers = {}
+        for line in raw_headers.decode('utf-8', 'replace').split('\r\n'):
+            header, _, value = line.partition(':')
+            headers[header.strip().title()] = value.strip()
+        disposition, params = self.parse_header_value(
+            headers.get('Content-Disposition', ''))
+        if disposition != 'form-data' or 'name' not in params:
+            raise HttpError('400 Bad Request',
+                            data="Malformed multipart headers")
+        if 'filename' not in params:
+            return FieldPart(params['name'])
+        content_type = headers.get('Content-Type', 'application/octet-stream')
+        return FilePart(
+            name=params['name'],
+            filename=params['filename'],
+            content_type=content_type,
+            file=tempfile.SpooledTemporaryFile(max_size=self.spool_size),
+        )
+
+    def write_part(self, part, data):
+        if isinstance(part, FilePart):
+            max_size = self.max_file_size
+        else:
+            max_size = self.max_field_size
+        if max_size is not None and part.size + len(data) > max_size:
+            raise HttpError('413 Request Entity Too Large',
+                            data="Part '%s' is too large" % part.name)
+        part.write(data)
@@ -5,6 +5,11 @@ from marnadi.utils import cached_property, CachedDescriptor
 
 
 class HeadersMixin(collections.Mapping):
+    """Dict-like object mapping header names to lists of their values.
+
+    Subclasses must provide `_headers` dict and `_rendered` dict with
+    already rendered string values of the headers.
+    """
 
     if hasattr(collections.Mapping, '__slots__'):
         __slots__ = '__weakref__',
@@ -24,43 +29,211 @@ class HeadersMixin(collections.Mapping):
 
     __ne__ = object.__ne__
 
-    @cached_property
-    def _headers(self):
-        raise ValueError("This property must be set before using")
+    def _iter_values(self):
+        """Generate (header, values, is_rendered) tuples."""
+        for header, values in self._headers.items():
+            yield header, values, True
 
     def items(self, stringify=False):
-        for header, values in self._headers.items():
+        for header, values, is_rendered in self._iter_values():
+            if stringify:
+                if is_rendered:
+                    values = self._rendered[header]
+                else:
+                    values = map(str, values)
             for value in values:
-                yield header, str(value) if stringify else value
+                yield header, value
 
     def values(self, stringify=False):
-        for values in self._headers.values():
-            for value in values:
-                yield str(value) if stringify else value
+        for header, value in self.items(stringify=stringify):
+            yield value
+
+
+class RequestHeaders(collections.Mapping):
+    """Request headers - lazy read-only dict-like view of WSGI environ.
+
+    Lookup of single header is translated directly to the environ key,
+    full dict of headers is built only if it is iterated.
+    """
+
+    if hasattr(collections.Mapping, '__slots__'):
+        __slots__ = '_environ', '_all_headers', '__weakref__'
+
+    special_environ_keys = {
+        'Content-Type': 'CONTENT_TYPE',
+        'Content-Length': 'CONTENT_LENGTH',
+    }
+
+    __hash__ = object.__hash__
+
+    __eq__ = object.__eq__
+
+    __ne__ = object.__ne__
+
+    def __init__(self, environ):
+        self._environ = environ
+
+    def __getitem__(self, header):
+        try:
+            environ_key = self.environ_keys[header]
+        except KeyError:
+            environ_key = self.make_environ_key(header)
+        return self._environ[environ_key]
+
+    def __len__(self):
+        return len(self._headers)
+
+    def __iter__(self):
+        return iter(self._headers)
+
+    @classmethod
+    def make_environ_key(cls, header):
+        header = header.title()
+        try:
+            return cls.special_environ_keys[header]
+        except KeyError:
+            return 'HTTP_' + header.upper().replace('-', '_')
+
+    @cached_property.in_slot('_all_headers')
+    def _headers(self):
+        return {
+            name.title().replace('_', '-'): value
+            for name, value in
+            itertools.chain(
+                (
+                    (env_key, self._environ[env_key])
+                    for env_key in ('CONTENT_TYPE', 'CONTENT_LENGTH')
+                    if env_key in self._environ
+                ),
+                (
+                    (env_key[5:], env_value)
+                    for env_key, env_value in self._environ.items()
+                    if env_key.startswith('HTTP_')
+                ),
+            )
+        }
+
+
+RequestHeaders.environ_keys = {
+    header: RequestHeaders.make_environ_key(header)
+    for header in (
+        'Accept',
+        'Accept-Charset',
+        'Accept-Encoding',
+        'Accept-Language',
+        'Authorization',
+        'Cache-Control',
+        'Connection',
+        'Content-Length',
+        'Content-Type',
+        'Cookie',
+        'Host',
+        'If-Match',
+        'If-Modified-Since',
+        'If-None-Match',
+        'If-Range',
+        'If-Unmodified-Since',
+        'Origin',
+        'Pragma',
+        'Range',
+        'Referer',
+        'User-Agent',
+        'X-Forwarded-For',
+        'X-Forwarded-Proto',
+        'X-Requested-With',
+    )
+}
 
 
 class ResponseHeaders(HeadersMixin, collections.MutableMapping):
+    """Response headers - layered dict-like object.
 
-    __slots__ = ()
+    Read-only default headers and their rendered values are shared with
+    :class:`Headers` descriptor. Changes are kept by sparse per-response
+    overlay which is created on the first change (deleted headers are
+    marked by None there).
+    """
 
-    def __init__(self, default_headers):
+    __slots__ = '_headers', '_rendered', '_changes'
+
+    def __init__(self, default_headers, rendered_headers=None):
         self._headers = default_headers
+        self._rendered = rendered_headers or {}
+        self._changes = None
+
+    def __getitem__(self, header):
+        header = header.title()
+        changes = self._changes
+        if changes is not None and header in changes:
+            values = changes[header]
+            if values is None:
+                raise KeyError(header)
+            return values
+        return self._headers[header]
+
+    def __iter__(self):
+        if self._changes is None:
+            return iter(self._headers)
+        return (header for header, _, _ in self._iter_values())
+
+    def __len__(self):
+        if self._changes is None:
+            return len(self._headers)
+        return sum(1 for _ in self._iter_values())
 
     def __delitem__(self, header):
-        del self._headers[header.title()]
+        header = header.title()
+        self[header]  # raises KeyError if header is missing
+        changes = self._get_changes()
+        if header in self._headers:
+            changes[header] = None
+        else:
+            del changes[header]
 
     def __setitem__(self, header, value):
-        self._headers[header.title()] = [value]
+        self._get_changes()[header.title()] = [value]
+
+    def _get_changes(self):
+        if self._changes is None:
+            self._changes = {}
+        return self._changes
+
+    def _iter_values(self):
+        changes = self._changes
+        if changes is None:
+            for item in super(ResponseHeaders, self)._iter_values():
+                yield item
+            return
+        for header, values in self._headers.items():
+            if header not in changes:
+                yield header, values, True
+            elif changes[header] is not None:
+                yield header, changes[header], False
+        for header, values in changes.items():
+            if header not in self._headers:
+                yield header, values, False
 
     def append(self, header, value):
-        self._headers[header.title()].append(value)
+        header = header.title()
+        changes = self._get_changes()
+        try:
+            values = changes[header]
+        except KeyError:
+            values = changes[header] = list(self._headers.get(header, ()))
+        if values is None:  # header was deleted
+            values = changes[header] = []
+        values.append(value)
 
     def extend(self, *headers):
         for header in headers:
             self.append(*header)
 
     def setdefault(self, header, default=None):
-        return self._headers.setdefault(header.title(), [default])
+        try:
+            return self[header]
+        except KeyError:
+            values = self._get_changes()[header.title()] = [default]
+            return values
 
     def clear(self, *headers):
         if headers:
@@ -70,21 +243,38 @@ class ResponseHeaders(HeadersMixin, collections.MutableMapping):
                 except KeyError:
                     pass
         else:
-            self._headers.clear()
+            self._changes = dict.fromkeys(self._headers)
 
 
 class Headers(CachedDescriptor, HeadersMixin):
+    """Descriptor providing :class:`ResponseHeaders` with given defaults.
+
+    Defaults are read-only (values of each header are kept by tuple), their
+    string values are rendered once on descriptor creation.
+    """
 
-    __slots__ = ()
+    __slots__ = '_headers', '_rendered'
 
     def __init__(self, *default_headers, **kw_default_headers):
-        super(Headers, self).__init__()
-        self._headers = collections.defaultdict(list)
+        super(Headers, self).__init__(
+            slot=kw_default_headers.pop('slot', None))
+        headers = {}
         for header, value in itertools.chain(
             default_headers,
             kw_default_headers.items(),
         ):
-            self._headers[header.title()].append(value)
+            headers.setdefault(header.title(), []).append(value)
+        self._headers = {
+            header: tuple(values)
+            for header, values in headers.items()
+        }
+        self._rendered = {
+            header: tuple(map(str, values))
+            for header, values in self._headers.items()
+        }
 
     def get_value(self, instance):
-        return ResponseHeaders(default_headers=self._headers.copy())
+        return ResponseHeaders(
+            default_headers=self._headers,
+            rendered_headers=self._rendered,
+        )
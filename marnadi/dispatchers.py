@@ -0,0 +1,309 @@
+import operator
+import os
+import re
+
+from marnadi.errors import HttpError
+from marnadi.utils import cached_property, LRUCache
+
+
+class Dispatcher(object):
+    """Base class for compiled dispatchers.
+
+    Dispatcher is built from the list of compiled routes of the
+    application and returns matched route and its params for the requested
+    path. Lookup results must be the same as of :meth:`App.find_route`.
+
+    Lookup results (including misses) may be kept in the LRU cache keyed
+    by path, the cache is enabled by nonzero `cache_size`.
+
+    Args:
+        routes (list): routes compiled by :meth:`App.compile_routes`.
+        cache_size (int): overrides `cache_size` attribute of the class.
+    """
+
+    __slots__ = 'routes', 'cache', '__weakref__'
+
+    cache_size = 0
+
+    def __init__(self, routes, cache_size=None):
+        self.routes = routes
+        if cache_size is None:
+            cache_size = self.cache_size
+        self.cache = LRUCache(cache_size) if cache_size else None
+
+    def __call__(self, path):
+        if self.cache is None:
+            match = self.match(self.compiled_routes, path, {})
+        else:
+            match = self.cache.get(path, self)
+            if match is self:  # cache miss
+                match = self.match(self.compiled_routes, path, {})
+                self.cache.set(path, match)
+        if match is None:
+            raise HttpError('404 Not Found')  # matching route not found
+        return match
+
+    @cached_property
+    def compiled_routes(self):
+        return self.compile(self.routes)
+
+    def invalidate(self):
+        """Drop compiled routes, must be called when routes are changed."""
+        del self.compiled_routes
+        if self.cache is not None:
+            self.cache.clear()
+
+    def compile(self, routes):
+        raise NotImplementedError
+
+    def match(self, compiled_routes, path, params):
+        """Return (route, params) tuple or None if nothing matched."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _merge_dicts(target, *sources):
+        for source in sources:
+            target.update(source)
+        return target
+
+
+class RouteTree(object):
+    """Radix tree over literal prefixes of sibling routes.
+
+    Each node keeps entries of routes which literal prefix ends at it.
+    Routes with placeholders are pattern edges starting from such node.
+    """
+
+    __slots__ = 'edges', 'entries'
+
+    def __init__(self):
+        self.edges = {}
+        self.entries = []
+
+    def insert(self, prefix, entry):
+        node = self
+        while prefix:
+            try:
+                label, child = node.edges[prefix[0]]
+            except KeyError:
+                child = RouteTree()
+                node.edges[prefix[0]] = prefix, child
+                node = child
+                break
+            common = 0
+            for label_char, prefix_char in zip(label, prefix):
+                if label_char != prefix_char:
+                    break
+                common += 1
+            if common < len(label):  # split edge
+                middle = RouteTree()
+                middle.edges[label[common]] = label[common:], child
+                node.edges[prefix[0]] = label[:common], middle
+                child = middle
+            node, prefix = child, prefix[common:]
+        node.entries.append(entry)
+
+    def lookup(self, path):
+        """Return entries which prefix matches the path in insertion order."""
+        node, position, entries = self, 0, list(self.entries)
+        while position < len(path):
+            try:
+                label, node = node.edges[path[position]]
+            except KeyError:
+                break
+            if not path.startswith(label, position):
+                break
+            position += len(label)
+            entries.extend(node.entries)
+        entries.sort(key=operator.itemgetter(0))
+        return entries
+
+
+class TreeDispatcher(Dispatcher):
+    """Dispatcher using :class:`RouteTree` for each level of routes.
+
+    Only routes which literal prefix matches requested path are checked,
+    so lookup cost depends on the path length rather than routes count.
+    """
+
+    __slots__ = ()
+
+    def compile(self, routes):
+        tree = RouteTree()
+        for index, route in enumerate(routes):
+            subroutes = None
+            if isinstance(route.handler, list):
+                subroutes = self.compile(route.handler)
+            tree.insert(route.prefix, (index, route, subroutes))
+        return tree
+
+    def match(self, tree, path, params):
+        for index, route, subroutes in tree.lookup(path):
+            match = route.match(path)
+            if not match:
+                continue
+            rest_path, url_params = match
+            if subroutes is not None:
+                result = self.match(
+                    subroutes,
+                    rest_path,
+                    self._merge_dicts(params.copy(), route.params, url_params),
+                )
+                if result is not None:
+                    return result
+                continue
+            if not rest_path:
+                return route, self._merge_dicts(
+                    params, route.params, url_params)
+
+
+class RouteAlternation(object):
+    """Sibling routes merged into alternation patterns selecting a route.
+
+    Placeholders become non-capturing groups, each route is followed by
+    single empty marker group, so `lastindex` of the match tells the first
+    route which may match the path. Leaf routes are anchored to the end
+    of path, common literal prefixes of neighbour routes are factored
+    out. Routes are split into several patterns of at most
+    `max_groups` groups each (older Pythons limit number of groups
+    to 100).
+
+    Since placeholders may backtrack to reach the end of path, selected
+    leaf route must be checked by its own pattern.
+    """
+
+    __slots__ = 'routes', 'patterns'
+
+    max_groups = 99
+
+    group_name_re = re.compile(r'\(\?P<[a-zA-Z_][a-zA-Z0-9_]*>')
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.patterns = {}
+
+    def match(self, path, start=0):
+        """Return index of the first route which may match the path.
+
+        Routes preceding `start` index are not considered.
+        """
+        try:
+            patterns = self.patterns[start]
+        except KeyError:
+            patterns = self.patterns[start] = self.make_patterns(start)
+        for pattern, indexes in patterns:
+            match = pattern.match(path)
+            if match is not None:
+                return indexes[match.lastindex]
+        return None
+
+    def make_patterns(self, start=0):
+        """Return list of (pattern, {marker group: route index}) tuples."""
+        patterns = []
+        alternatives, indexes, groups = [], {}, 0
+        for index in range(start, len(self.routes)):
+            route, subroutes = self.routes[index]
+            if route.pattern is None:
+                route_pattern = ''
+                route_groups = 0
+            else:
+                # pattern without groups is matched as literal prefix
+                _, group, rest = route.pattern.pattern.partition('(?P<')
+                route_pattern = self.group_name_re.sub('(?:', group + rest)
+                route_groups = re.compile(route_pattern).groups
+            if alternatives and groups + route_groups + 1 > self.max_groups:
+                patterns.append(self.compile(alternatives, indexes))
+                alternatives, indexes, groups = [], {}, 0
+            groups += route_groups + 1
+            indexes[groups] = index
+            alternatives.append((route.prefix, '{pattern}(){anchor}'.format(
+                pattern=route_pattern,
+                anchor=r'\Z' if subroutes is None else '',
+            )))
+        if alternatives:
+            patterns.append(self.compile(alternatives, indexes))
+        return patterns
+
+    @classmethod
+    def compile(cls, alternatives, indexes):
+        return re.compile(cls.factor(alternatives)), indexes
+
+    @classmethod
+    def factor(cls, alternatives):
+        """Join (literal prefix, pattern) alternatives into single pattern.
+
+        Common literal prefixes of consecutive alternatives are matched
+        once, that keeps the order in which alternatives are tried.
+        """
+        result = []
+        position = 0
+        while position < len(alternatives):
+            prefix, pattern = alternatives[position]
+            end = position + 1
+            if prefix:
+                while (
+                    end < len(alternatives) and
+                    alternatives[end][0][:1] == prefix[:1]
+                ):
+                    end += 1
+            if end - position == 1:
+                result.append(re.escape(prefix) + pattern)
+            else:
+                run = alternatives[position:end]
+                common = os.path.commonprefix([prefix for prefix, _ in run])
+                result.append('{prefix}(?:{alternatives})'.format(
+                    prefix=re.escape(common),
+                    alternatives=cls.factor([
+                        (prefix[len(common):], pattern)
+                        for prefix, pattern in run
+                    ]),
+                ))
+            position = end
+        return '|'.join(result)
+
+
+class RegexDispatcher(Dispatcher):
+    """Dispatcher selecting route of each level by single regex call.
+
+    Sibling routes are merged into :class:`RouteAlternation`, so the winning
+    route is found by one `re.match` call, then its params are taken by
+    its own pattern. If nested routes of the winner don't match, matching
+    continues from the next one.
+    """
+
+    __slots__ = ()
+
+    def compile(self, routes):
+        return RouteAlternation([
+            (
+                route,
+                self.compile(route.handler)
+                if isinstance(route.handler, list) else None,
+            )
+            for route in routes
+        ])
+
+    def match(self, alternation, path, params):
+        start = 0
+        while True:
+            index = alternation.match(path, start)
+            if index is None:
+                return None
+            start = index + 1
+            route, subroutes = alternation.routes[index]
+            match = route.match(path)
+            if not match:
+                continue
+            rest_path, url_params = match
+            if subroutes is None:
+                if rest_path:
+                    continue  # alternation reached the end by backtracking
+                return route, self._merge_dicts(
+                    params, route.params, url_params)
+            result = self.match(
+                subroutes,
+                rest_path,
+                self._merge_dicts(params.copy(), route.params, url_params),
+            )
+            if result is not None:
+                return result
@@ -19,7 +19,7 @@ class HttpError(Exception):
         self.status = status
         self.data = data
         if headers:
-            self.headers.extend(headers)
+            self.headers.extend(*headers)
         self.error = error
         self.traceback = traceback
 
@@ -1,10 +1,22 @@
+import calendar
+import datetime
+import email.utils
+import functools
+import hashlib
+import io
 import logging
-import itertools
+import mmap
+import os
 import sys
+import uuid
+import zlib
 
 from marnadi import descriptors, Header
 from marnadi.errors import HttpError
-from marnadi.utils import metaclass, to_bytes, cached_property, coroutine
+from marnadi.instrumentation import ResponseStats, timer
+from marnadi.utils import (
+    metaclass, to_bytes, cached_property, coroutine, http_date,
+)
 
 try:
     str = unicode
@@ -12,12 +24,48 @@ except NameError:
     pass
 
 
+class Status(object):
+    """Response status which may be changed for particular response.
+
+    Class attribute `status` of handlers is replaced by this descriptor,
+    so it remains the default for all responses of the handler.
+    """
+
+    __slots__ = 'default',
+
+    def __init__(self, default):
+        self.default = default
+
+    def __get__(self, instance, instance_type=None):
+        if instance is None:
+            return self.default
+        try:
+            return instance._status
+        except AttributeError:
+            return self.default
+
+    def __set__(self, instance, value):
+        instance._status = value
+
+    def __delete__(self, instance):
+        try:
+            del instance._status
+        except AttributeError:
+            pass
+
+
 class Handler(type):
 
     __func__ = None
 
     logger = logging.getLogger('marnadi')
 
+    def __new__(mcs, name, bases, attributes):
+        status = attributes.get('status')
+        if isinstance(status, (str, bytes)):
+            attributes['status'] = Status(status)
+        return super(Handler, mcs).__new__(mcs, name, bases, attributes)
+
     def __call__(cls, *args, **kwargs):
         func = cls.__func__
         if func is not None:
@@ -27,6 +75,11 @@ class Handler(type):
     def get_instance(cls, *args, **kwargs):
         return type.__call__(cls, *args, **kwargs)
 
+    def get_response(cls, application, request, params):
+        """Return new response with headers ready to be sent."""
+        response = cls.get_instance(application, request)
+        return response.iterator.send(params)
+
     def provider(cls, func):
         assert callable(func)
         attributes = dict(
@@ -46,11 +99,20 @@ class Handler(type):
             For example your version may catch `HttpError` from original
             implementation and reraise it with necessary content data
             (which may be a HTML containing formatted traceback).
+
+            Asynchronous applications complete the response after it's
+            returned (see `async_result` of :class:`Response`), errors
+            raised meanwhile are thrown into this coroutine.
         """
         application, request = yield
         try:
-            response = cls.get_instance(application, request)
-            yield response.iterator.send(kwargs)
+            cache = cls.response_cache
+            key = cache and cache.make_key(cls, request, kwargs)
+            if key is None:
+                yield cls.get_response(application, request, kwargs)
+            else:  # handler is called on cache miss only
+                yield cache.get_or_set(key, functools.partial(
+                    cls.get_response, application, request, kwargs))
         except HttpError:
             raise
         except Exception as error:
@@ -64,7 +126,9 @@ class Handler(type):
 @metaclass(Handler)
 class Response(object):
 
-    __slots__ = 'application', 'request', '__weakref__'
+    __slots__ = ('application', 'request', 'body_file', 'stats',
+                 'async_result', '_status', '_headers', '_cookies',
+                 '_iterator', '__weakref__')
 
     supported_http_methods = {
         'OPTIONS', 'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE',
@@ -72,11 +136,41 @@ class Response(object):
 
     status = '200 OK'
 
+    buffer_chunk_size = 64 * 1024
+
+    max_ranges = 16
+
+    auto_etag = False
+
+    response_cache = None
+
+    server_timing = False
+
+    compress = False
+
+    compress_level = 6
+
+    compress_min_size = 1024
+
+    compress_encodings = ('gzip', 'deflate')
+
+    compress_wbits = {
+        'gzip': 16 + zlib.MAX_WBITS,
+        'deflate': zlib.MAX_WBITS,
+    }
+
+    compress_skip_types = (
+        'image/', 'audio/', 'video/', 'font/woff',
+        'application/zip', 'application/gzip', 'application/x-gzip',
+        'application/octet-stream',
+    )
+
     headers = descriptors.Headers(
         ('Content-Type', Header('text/plain', charset='utf-8')),
+        slot='_headers',
     )
 
-    cookies = descriptors.Cookies()
+    cookies = descriptors.Cookies(slot='_cookies')
 
     def __init__(self, application, request):
         self.application = application
@@ -94,22 +188,76 @@ class Response(object):
                 '405 Method Not Allowed',
                 headers=(('Allow', ', '.join(self.allowed_http_methods)), )
             )
+        if self.request.method in ('GET', 'HEAD'):
+            if self.check_validators(**kwargs):
+                return self.not_modified()
         return callback(**kwargs)
 
     def __iter__(self):
         return self.iterator
 
-    @cached_property
+    @cached_property.in_slot('_iterator')
     @coroutine
     def iterator(self):
         kwargs = yield  # optional request params injection
-        result = self(**(kwargs or {}))
+        if self.measured:
+            stats = self.stats = ResponseStats()
+            started = timer()
+            result = self(**(kwargs or {}))
+            handler_finished = timer()
+            chunks = self.make_chunks(result)
+            first_chunk = next(chunks)
+            stats.handler_time = handler_finished - started
+            stats.first_chunk_time = timer() - handler_finished
+            if self.server_timing:
+                self.headers['Server-Timing'] = stats.server_timing()
+            chunks = stats.measure(first_chunk, chunks)
+            first_chunk = next(chunks)
+        else:
+            chunks = self.make_chunks(self(**(kwargs or {})))
+            first_chunk = next(chunks)  # headers are complete after it
+        if kwargs is not None:
+            yield self  # request params injection returns self
+        yield first_chunk
+        for chunk in chunks:
+            yield chunk
+
+    def make_chunks(self, result):
+        """Return iterator of body chunks of the result of handler method.
+
+        Awaitables and asynchronous iterables are kept as `async_result`
+        to be completed by asynchronous application, the body is empty
+        until then.
+        """
+        if self.asynchronous and (
+            hasattr(result, '__await__') or hasattr(result, '__aiter__')
+        ):
+            self.async_result = result
+            return iter((b'', ))
+        return self.compress_chunks(self.iterate(result))
+
+    def iterate(self, result):
+        """Generate body chunks of the result returned by handler method.
+
+        `Content-Length` header is set (if possible) before the first chunk
+        is returned. Buffers (e.g. `bytearray` or `memoryview`) are split to
+        chunks of `buffer_chunk_size` bytes without copying. Files having
+        descriptor are returned by chunks of memory mapped file (but
+        application may pass `body_file` to the WSGI server instead).
+        """
         if result is None or isinstance(result, (str, bytes)):
             chunk = to_bytes(result)
+            if self.auto_etag and self.check_body_etag(chunk):
+                yield b''
+                return
             self.headers.setdefault('Content-Length', len(chunk))
-            if kwargs is not None:
-                yield self  # request params injection returns self
             yield chunk
+        elif isinstance(result, (bytearray, memoryview)):
+            for chunk in self.iterate_buffer(result):
+                yield chunk
+        elif self.get_fileno(result) is not None:
+            for chunk in self.iterate_file(result):
+                yield chunk
         else:
             chunks = iter(result)
             first_chunk = to_bytes(next(chunks, b''))
@@ -123,10 +271,354 @@ class Response(object):
                         'Content-Length',
                         len(first_chunk),
                     )
-            if kwargs is not None:
-                yield self  # request params injection returns self
-            for chunk in itertools.chain((first_chunk, ), chunks):
-                yield to_bytes(chunk, error_callback=self.logger.exception)
+            yield first_chunk
+            pass_memoryview = self.pass_memoryview
+            for chunk in chunks:
+                if pass_memoryview and isinstance(chunk, memoryview):
+                    yield chunk
+                else:
+                    yield to_bytes(
+                        chunk,
+                        error_callback=type(self).logger.exception,
+                    )
+
+    def iterate_buffer(self, buffer):
+        view = memoryview(buffer)
+        if view.itemsize != 1 or view.ndim != 1:
+            try:
+                view = view.cast('B')
+            except AttributeError:  # python 2.x
+                view = memoryview(view.tobytes())
+        if self.auto_etag and self.check_body_etag(view):
+            yield b''
+            return
+        size = len(view)  # view of bytes
+        parts = self.make_parts(size)
+        if not size:
+            yield b''
+            return
+        pass_memoryview = self.pass_memoryview
+        for prefix, start, end in parts:
+            if prefix:
+                yield prefix
+            for chunk_start in range(start, end, self.buffer_chunk_size):
+                chunk_end = min(chunk_start + self.buffer_chunk_size, end)
+                chunk = view[chunk_start:chunk_end]
+                yield chunk if pass_memoryview else chunk.tobytes()
+
+    @staticmethod
+    def get_fileno(result):
+        try:
+            return result.fileno()
+        except (AttributeError, io.UnsupportedOperation, IOError, OSError):
+            return None
+
+    def iterate_file(self, file):
+        fileno = file.fileno()
+        offset = file.tell()
+        size = max(os.fstat(fileno).st_size - offset, 0)
+        parts = self.make_parts(size)
+        if parts[0][0] is None:  # whole file is sent
+            self.body_file = file
+        chunk_size = self.buffer_chunk_size
+        yield b''  # file isn't touched until the body is really iterated
+        try:
+            try:
+                mapped_file = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+            except (ValueError, EnvironmentError):  # empty or special file
+                mapped_file = None
+            try:
+                for prefix, start, end in parts:
+                    if prefix:
+                        yield prefix
+                    start, end = offset + start, offset + end
+                    if mapped_file is None:
+                        file.seek(start)
+                    for chunk_start in range(start, end, chunk_size):
+                        chunk_end = min(chunk_start + chunk_size, end)
+                        if mapped_file is None:
+                            yield file.read(chunk_end - chunk_start)
+                        else:
+                            yield mapped_file[chunk_start:chunk_end]
+            finally:
+                if mapped_file is not None:
+                    mapped_file.close()
+        finally:
+            file.close()
+
+    def get_ranges(self, size):
+        """Return list of (start, end) byte ranges requested by client.
+
+        None is returned if the whole body of given size should be sent,
+        ranges are applied to `200 OK` responses only.
+        """
+        if self.status != '200 OK':
+            return None
+        try:
+            if self.request.method not in ('GET', 'HEAD'):
+                return None
+            header = self.request.headers['Range']
+            if_range = self.request.headers.get('If-Range')
+        except (AttributeError, KeyError):
+            return None
+        if if_range is not None and not self.match_if_range(if_range):
+            return None
+        unit, _, specs = header.partition('=')
+        if unit.strip().lower() != 'bytes':
+            return None
+        specs = specs.split(',')
+        if len(specs) > self.max_ranges:
+            return None
+        ranges = []
+        try:
+            for spec in specs:
+                start, _, end = spec.strip().partition('-')
+                if not start:  # suffix range, e.g. "-500"
+                    start, end = max(size - int(end), 0), size
+                else:
+                    start = int(start)
+                    end = min(int(end) + 1, size) if end else size
+                if start < 0 or end <= start and start < size:
+                    return None  # syntactically invalid range
+                if start < size:
+                    ranges.append((start, end))
+        except ValueError:
+            return None
+        if not ranges:
+            raise HttpError(
+                '416 Requested Range Not Satisfiable',
+                headers=(('Content-Range', 'bytes */%d' % size), ),
+            )
+        return ranges
+
+    def make_parts(self, size):
+        """Set headers according to requested ranges and return body parts.
+
+        Each part is (prefix, start, end) tuple, where `prefix` is bytes
+        preceding the range of body (None if the whole body is sent).
+        """
+        self.headers.setdefault('Accept-Ranges', 'bytes')
+        ranges = self.get_ranges(size)
+        if ranges is None:
+            self.headers.setdefault('Content-Length', size)
+            return [(None, 0, size)]
+        self.status = '206 Partial Content'
+        if len(ranges) == 1:
+            (start, end), = ranges
+            self.headers['Content-Range'] = 'bytes %d-%d/%d' % (
+                start, end - 1, size)
+            self.headers['Content-Length'] = end - start
+            return [(b'', start, end)]
+        boundary = uuid.uuid4().hex
+        content_type = self.headers.get('Content-Type')
+        content_type = content_type and str(content_type[0])
+        self.headers['Content-Type'] = Header(
+            'multipart/byteranges', boundary=boundary)
+        parts = []
+        for start, end in ranges:
+            prefix = '\r\n--%s\r\n' % boundary
+            if content_type:
+                prefix += 'Content-Type: %s\r\n' % content_type
+            prefix += 'Content-Range: bytes %d-%d/%d\r\n\r\n' % (
+                start, end - 1, size)
+            parts.append((prefix.encode('latin1'), start, end))
+        parts.append((
+            ('\r\n--%s--\r\n' % boundary).encode('latin1'), 0, 0))
+        self.headers['Content-Length'] = sum(
+            len(prefix) + end - start for prefix, start, end in parts)
+        return parts
+
+    def compress_chunks(self, chunks):
+        """Return body chunks compressed according to `Accept-Encoding`.
+
+        Compression is enabled by `compress` attribute. It is skipped for
+        bodies smaller than `compress_min_size`, partial or already encoded
+        responses and types listed by `compress_skip_types`.
+        """
+        if not self.compress:
+            return chunks
+        return self.iterate_compressed(chunks)
+
+    def iterate_compressed(self, chunks):
+        first_chunk = next(chunks)  # headers are complete after first chunk
+        encoding = self.get_compress_encoding()
+        if encoding is None:
+            yield first_chunk
+            for chunk in chunks:
+                yield chunk
+            return
+        compressor = zlib.compressobj(
+            self.compress_level,
+            zlib.DEFLATED,
+            self.compress_wbits[encoding],
+        )
+        self.headers['Content-Encoding'] = encoding
+        self.body_file = None  # file must not be passed to the server as is
+        etag = self.headers.get('ETag')
+        if etag and not str(etag[0]).startswith('W/'):
+            # strong validator must differ from the one of identity body
+            self.headers['ETag'] = 'W/' + str(etag[0])
+        content_length = self.headers.get('Content-Length')
+        if content_length and int(content_length[0]) == len(first_chunk):
+            # whole body is available, so the length is still known
+            first_chunk = compressor.compress(first_chunk) + compressor.flush()
+            self.headers['Content-Length'] = len(first_chunk)
+            yield first_chunk
+            return
+        self.headers.clear('Content-Length')
+        yield compressor.compress(first_chunk)
+        for chunk in chunks:
+            chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        yield compressor.flush()
+
+    def get_compress_encoding(self):
+        """Return encoding to be used for the body or None."""
+        headers = self.headers
+        if 'Content-Encoding' in headers or 'Content-Range' in headers:
+            return None
+        if self.status[:3] in ('204', '206', '304'):
+            return None
+        content_type = headers.get('Content-Type')
+        if content_type:
+            content_type = str(content_type[0]).lower()
+            if content_type.startswith(self.compress_skip_types):
+                return None
+        content_length = headers.get('Content-Length')
+        if content_length and int(content_length[0]) < self.compress_min_size:
+            return None
+        headers.append('Vary', 'Accept-Encoding')
+        try:
+            accept_encoding = self.request.headers['Accept-Encoding']
+        except (AttributeError, KeyError):
+            return None
+        qualities = {}
+        for item in accept_encoding.split(','):
+            encoding, _, params = item.partition(';')
+            quality = 1.0
+            params = params.strip().replace(' ', '')
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0
+            qualities[encoding.strip().lower()] = quality
+        default_quality = qualities.get('*', 0)
+        best_encoding, best_quality = None, 0
+        for encoding in self.compress_encodings:
+            quality = qualities.get(encoding, default_quality)
+            if quality > best_quality:
+                best_encoding, best_quality = encoding, quality
+        return best_encoding
+
+    def get_etag(self, **kwargs):
+        """Return cheap validator of the resource (e.g. version or hash).
+
+        Called with request params before the handler method, value is
+        sent as `ETag` header and compared with `If-None-Match`.
+        """
+        return None
+
+    def get_last_modified(self, **kwargs):
+        """Return modification time of the resource (timestamp or datetime).
+
+        Called with request params before the handler method, value is
+        sent as `Last-Modified` header and compared with `If-Modified-Since`.
+        """
+        return None
+
+    def check_validators(self, **kwargs):
+        """Set validator headers and return True if client's copy is fresh."""
+        etag = self.get_etag(**kwargs)
+        if etag is not None:
+            etag = self.quote_etag(etag)
+            self.headers['ETag'] = etag
+        last_modified = self.get_last_modified(**kwargs)
+        if last_modified is not None:
+            if isinstance(last_modified, datetime.datetime):
+                last_modified = calendar.timegm(last_modified.utctimetuple())
+            last_modified = int(last_modified)
+            self.headers['Last-Modified'] = http_date(last_modified)
+        if etag is None and last_modified is None:
+            return False
+        return self.is_not_modified(etag, last_modified)
+
+    def check_body_etag(self, body):
+        """Set ETag made of body hash, return True if client's copy is fresh.
+
+        Only complete bodies (strings and buffers) are hashed, handlers
+        declaring their own validator by :meth:`get_etag` are skipped.
+        """
+        if self.request.method not in ('GET', 'HEAD'):
+            return False
+        if 'ETag' in self.headers:
+            return False
+        etag = self.quote_etag(hashlib.sha1(body).hexdigest())
+        self.headers['ETag'] = etag
+        if self.is_not_modified(etag):
+            self.not_modified()
+            return True
+        return False
+
+    def is_not_modified(self, etag=None, last_modified=None):
+        headers = self.request.headers
+        if_none_match = headers.get('If-None-Match')
+        if if_none_match is not None:  # If-Modified-Since is ignored then
+            return etag is not None and self.match_etag(if_none_match, etag)
+        if_modified_since = headers.get('If-Modified-Since')
+        if if_modified_since is None or last_modified is None:
+            return False
+        since = email.utils.parsedate_tz(if_modified_since)
+        return since is not None and (
+            last_modified <= email.utils.mktime_tz(since))
+
+    def match_if_range(self, if_range):
+        if if_range.startswith('"'):  # strong comparison of ETag
+            return if_range in self.headers.get('ETag', ())
+        return if_range in self.headers.get('Last-Modified', ())
+
+    @staticmethod
+    def match_etag(header, etag):
+        """Weak comparison of ETag with the list of `If-None-Match`."""
+        if header.strip() == '*':
+            return True
+        if etag.startswith('W/'):
+            etag = etag[2:]
+        for candidate in header.split(','):
+            candidate = candidate.strip()
+            if candidate.startswith('W/'):
+                candidate = candidate[2:]
+            if candidate == etag:
+                return True
+        return False
+
+    @staticmethod
+    def quote_etag(value):
+        value = str(value)
+        if value.startswith(('"', 'W/"')):
+            return value
+        return '"%s"' % value
+
+    def not_modified(self):
+        """Turn response into `304 Not Modified`, return its empty body."""
+        self.status = '304 Not Modified'
+        self.headers.clear('Content-Type', 'Content-Length')
+        return iter(())  # neither body nor Content-Length are sent
+
+    @property
+    def measured(self):
+        """Whether :class:`ResponseStats` should be recorded."""
+        return self.server_timing or bool(
+            getattr(self.application, 'collectors', None))
+
+    @property
+    def pass_memoryview(self):
+        return getattr(self.application, 'pass_memoryview', False)
+
+    @property
+    def asynchronous(self):
+        return getattr(self.application, 'asynchronous', False)
 
     @property
     def allowed_http_methods(self):
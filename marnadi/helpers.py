@@ -5,16 +5,19 @@ from marnadi.utils import Lazy
 
 class Route(object):
 
-    __slots__ = 'path', 'handler', 'params', 'pattern', 'name'
+    __slots__ = 'path', 'handler', 'params', 'pattern', 'name', 'prefix'
 
     placeholder_re = re.compile(r'\{([a-zA-Z_][a-zA-Z0-9_]*)\}')
 
+    escaped_char_re = re.compile(r'\\(.)', re.DOTALL)
+
     def __init__(self, path, handler, name=None, params=None, patterns=None):
         self.path = path
         self.handler = Lazy(handler)
         self.name = name
         self.params = params or {}
         self.pattern = self.make_pattern(path, patterns)
+        self.prefix = self.make_prefix(path, self.pattern)
 
     def match(self, request_path):
         if self.pattern is not None:
@@ -34,7 +37,7 @@ class Route(object):
         pattern = re.escape(path.replace('{{', '{').replace('}}', '}'))
         for placeholder in placeholders:
             pattern = pattern.replace(
-                r'\{{{placeholder}\}}'.format(placeholder=placeholder),
+                re.escape('{%s}' % placeholder),
                 r'(?P<{name}>{pattern})'.format(
                     name=placeholder,
                     pattern=placeholder_patterns.get(placeholder, r'\w+')
@@ -42,6 +45,14 @@ class Route(object):
             )
         return re.compile(pattern)
 
+    @classmethod
+    def make_prefix(cls, path, pattern=None):
+        """Return literal part of the path preceding first placeholder."""
+        if pattern is None:
+            return path
+        escaped_prefix = pattern.pattern.split('(?P<', 1)[0]
+        return cls.escaped_char_re.sub(r'\1', escaped_prefix)
+
     def restore_path(self, **params):
         return self.path.format(**params)
 
@@ -0,0 +1,245 @@
+import bisect
+import threading
+import time
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+class Timing(object):
+    """Timings of single request passed to hooks of collectors.
+
+    Timestamps are values of :func:`timer`, those of the stages not
+    reached yet (or skipped because of error) are None. `route` is the
+    name of matched route (or name of the handler if route has no name),
+    it's known since `post_dispatch` hook. `stats` are known since
+    `first_byte` hook.
+    """
+
+    __slots__ = ('environ', 'application', 'route', 'status', 'started',
+                 'dispatched', 'first_byte', 'completed', 'stats')
+
+    def __init__(self, environ, application=None, started=None):
+        self.environ = environ
+        self.application = application
+        self.route = self.status = None
+        self.started = timer() if started is None else started
+        self.dispatched = self.first_byte = self.completed = None
+        self.stats = None  # ResponseStats if response provides them
+
+
+class ResponseStats(object):
+    """Breakdown of response generation recorded by `Response.iterator`.
+
+    Durations are in seconds: `handler_time` is the call of the handler
+    method, `first_chunk_time` is the time since the handler returned till
+    the first chunk of the body is ready, `stream_time` is the time since
+    then till the end of the body (None until the body is complete).
+    """
+
+    __slots__ = ('handler_time', 'first_chunk_time', 'stream_time',
+                 'chunks', 'bytes_sent')
+
+    def __init__(self):
+        self.handler_time = self.first_chunk_time = self.stream_time = None
+        self.chunks = self.bytes_sent = 0
+
+    def measure(self, first_chunk, chunks):
+        """Generate body chunks counting them and their size."""
+        started = timer()
+        try:
+            self.chunks, self.bytes_sent = 1, len(first_chunk)
+            yield first_chunk
+            for chunk in chunks:
+                self.chunks += 1
+                self.bytes_sent += len(chunk)
+                yield chunk
+        finally:
+            self.stream_time = timer() - started
+
+    def server_timing(self):
+        """Return value of `Server-Timing` header (durations in ms)."""
+        return 'handler;dur=%.3f, first-chunk;dur=%.3f' % (
+            self.handler_time * 1000, self.first_chunk_time * 1000)
+
+
+class Collector(object):
+    """Base class of instrumentation collectors, all hooks do nothing.
+
+    Collectors are registered by `collectors` argument of
+    :class:`marnadi.wsgi.App`.
+    """
+
+    __slots__ = ()
+
+    def pre_dispatch(self, timing):
+        """Called before route matching."""
+
+    def post_dispatch(self, timing):
+        """Called after route matching, before the handler is started."""
+
+    def first_byte(self, timing):
+        """Called when headers and the first chunk of the body are ready."""
+
+    def body_complete(self, timing):
+        """Called when the body is sent (or server closed it)."""
+
+
+class Histogram(object):
+    """Thread-safe histogram with exponential buckets.
+
+    Percentiles are estimated by upper bounds of buckets, so the relative
+    error doesn't exceed the ratio of neighbour bounds (about 19%).
+    """
+
+    __slots__ = 'bounds', 'counts', 'count', 'sum', 'max', '_lock'
+
+    default_bounds = tuple(1e-5 * 2 ** (index / 4.0) for index in range(100))
+
+    def __init__(self, bounds=None):
+        self.bounds = self.default_bounds if bounds is None else bounds
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = self.max = 0
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, percent):
+        with self._lock:
+            rank = self.count * percent / 100.0
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if count and seen >= rank:
+                    if index < len(self.bounds):
+                        return min(self.bounds[index], self.max)
+                    break
+            return self.max
+
+
+class HistogramCollector(Collector):
+    """Collector keeping in-process histograms of timings by route.
+
+    Collected metrics are `dispatch` (route matching), `first_byte`
+    (time to the first chunk of the body) and `total` (time to the end
+    of the body), all of them are measured from the start of request.
+    Responses providing :class:`ResponseStats` add `handler`,
+    `first_chunk` and `stream` durations.
+    """
+
+    __slots__ = 'histograms', '_lock'
+
+    percents = (50, 90, 99)
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def body_complete(self, timing):
+        started = timing.started
+        for metric, timestamp in (
+            ('dispatch', timing.dispatched),
+            ('first_byte', timing.first_byte),
+            ('total', timing.completed),
+        ):
+            if timestamp is not None:
+                self.get_histogram(timing.route, metric).add(
+                    timestamp - started)
+        stats = timing.stats
+        if stats is not None:
+            for metric, value in (
+                ('handler', stats.handler_time),
+                ('first_chunk', stats.first_chunk_time),
+                ('stream', stats.stream_time),
+            ):
+                if value is not None:
+                    self.get_histogram(timing.route, metric).add(value)
+
+    def get_histogram(self, route, metric):
+        key = route, metric
+        try:
+            return self.histograms[key]
+        except KeyError:
+            with self._lock:
+                return self.histograms.setdefault(key, Histogram())
+
+    def export(self, percents=None):
+        """Return {route: {metric: stats}} dict of collected timings.
+
+        Stats include `count`, `mean`, `max` and requested percentiles
+        named like `p50`.
+        """
+        result = {}
+        for (route, metric), histogram in list(self.histograms.items()):
+            stats = result.setdefault(route, {})[metric] = dict(
+                count=histogram.count,
+                mean=histogram.sum / (histogram.count or 1),
+                max=histogram.max,
+            )
+            for percent in percents or self.percents:
+                stats['p%s' % percent] = histogram.percentile(percent)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+
+
+def complete(timing, collectors):
+    """Mark the request complete and call `body_complete` hooks."""
+    timing.completed = timer()
+    for collector in collectors:
+        collector.body_complete(timing)
+
+
+class InstrumentedBody(object):
+    """WSGI iterable notifying collectors when the body is complete.
+
+    Collectors are notified when the body is closed or, if server never
+    closes it, when the body is garbage collected.
+    """
+
+    __slots__ = 'body', 'timing', 'collectors', 'closed'
+
+    def __init__(self, body, timing, collectors):
+        self.body = body
+        self.timing = timing
+        self.collectors = collectors
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            close = getattr(self.body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            complete(self.timing, self.collectors)
+
+
+class InstrumentedFile(InstrumentedBody):
+    """File passed to `wsgi.file_wrapper` notifying collectors on close.
+
+    Other attributes (e.g. `fileno` used by `sendfile()`) are proxied
+    to the file.
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        return getattr(self.body, name)
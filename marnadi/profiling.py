@@ -0,0 +1,164 @@
+import collections
+import cProfile
+import pstats
+import random
+import sys
+import threading
+import time
+
+from marnadi.descriptors.headers import RequestHeaders
+from marnadi.instrumentation import Collector
+
+try:
+    from threading import get_ident
+except ImportError:
+    from thread import get_ident
+
+
+class Profiler(Collector):
+    """Collector profiling sample of requests in process.
+
+    Profiled request is covered since route matching till the end of its
+    body. Profiles are aggregated in memory and may be dumped on demand
+    either in `pstats` format or as collapsed stacks (one line per stack,
+    frames separated by semicolon) made by sampling frames of profiled
+    request every `interval` seconds.
+
+    Only one request is profiled at a time, concurrent requests selected
+    for profiling are served as usual. Requests selected by `routes` are
+    profiled since the route is matched.
+
+    Args:
+        sample_rate (float): share of requests profiled at random.
+        routes (iterable): names of routes which requests are profiled.
+        header (str): name of request header which enables profiling of
+            the request (must not be accessible by untrusted clients).
+        interval (float): seconds between samples of stack, sampling is
+            disabled if None.
+    """
+
+    __slots__ = ('sample_rate', 'routes', 'environ_key', 'interval',
+                 'stats', 'stacks', 'requests', '_current', '_busy',
+                 '_stats_lock', '_wakeup', '_sampler', '__weakref__')
+
+    def __init__(
+        self,
+        sample_rate=0,
+        routes=(),
+        header=None,
+        interval=0.005,
+    ):
+        self.sample_rate = sample_rate
+        self.routes = frozenset(routes)
+        self.environ_key = header and RequestHeaders.make_environ_key(header)
+        self.interval = interval
+        self.stats = None
+        self.stacks = collections.Counter()
+        self.requests = 0
+        self._current = None
+        self._busy = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._sampler = None
+
+    def is_profiled(self, timing):
+        """Whether the request is profiled regardless of its route."""
+        if self.environ_key and self.environ_key in timing.environ:
+            return True
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        return False
+
+    def pre_dispatch(self, timing):
+        if self.is_profiled(timing):
+            self.start(timing)
+
+    def post_dispatch(self, timing):
+        if timing.route in self.routes:
+            self.start(timing)
+
+    def start(self, timing):
+        current = self._current
+        if current is not None and current[0] is timing:
+            return  # already profiled
+        if not self._busy.acquire(False):
+            return
+        profile = cProfile.Profile()
+        self._current = timing, profile, get_ident()
+        if self.interval is not None:
+            if self._sampler is None:
+                self._sampler = threading.Thread(
+                    target=self.sample,
+                    name='marnadi-profiler',
+                )
+                self._sampler.daemon = True
+                self._sampler.start()
+            self._wakeup.set()
+        try:
+            profile.enable()  # fails e.g. if another profiler is active
+        except Exception:
+            self._wakeup.clear()
+            self._current = None
+            self._busy.release()
+            raise
+
+    def body_complete(self, timing):
+        current = self._current
+        if current is None or current[0] is not timing:
+            return
+        profile = current[1]
+        profile.disable()
+        self._wakeup.clear()
+        self._current = None
+        try:
+            with self._stats_lock:
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+                self.requests += 1
+        finally:
+            self._busy.release()
+
+    def sample(self):
+        """Loop of the sampling thread collecting stacks of requests."""
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            current = self._current
+            if current is None:
+                continue
+            frame = sys._current_frames().get(current[2])
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s:%s' % (
+                    frame.f_globals.get('__name__', code.co_filename),
+                    code.co_name,
+                ))
+                frame = frame.f_back
+            with self._stats_lock:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump_stats(self, file):
+        """Write aggregated profile in `pstats` format to the file path."""
+        with self._stats_lock:
+            if self.stats is None:
+                raise ValueError('no requests have been profiled yet')
+            self.stats.dump_stats(file)
+
+    def collapsed_stacks(self):
+        """Return samples as collapsed stacks suitable for flame graphs."""
+        with self._stats_lock:
+            return ''.join(
+                '%s %d\n' % (stack, count)
+                for stack, count in sorted(self.stacks.items())
+            )
+
+    def clear(self):
+        with self._stats_lock:
+            self.stats = None
+            self.stacks.clear()
+            self.requests = 0
@@ -1,4 +1,8 @@
+import collections
+import email.utils
+import functools
 import importlib
+import threading
 import weakref
 
 try:
@@ -26,15 +30,30 @@ def metaclass(mcs):
 
 
 class CachedDescriptor(object):
+    """Descriptor caching value returned by `get_value` for each instance.
 
-    __slots__ = 'cache',
+    By default values are kept in the weak dictionary of descriptor. If
+    `slot` is provided values are kept in that slot of the instance instead
+    (the slot must be declared by `__slots__` of the owner class).
+    """
 
-    def __init__(self):
-        self.cache = weakref.WeakKeyDictionary()
+    __slots__ = 'cache', 'slot'
+
+    def __init__(self, slot=None):
+        self.slot = slot
+        self.cache = None if slot else weakref.WeakKeyDictionary()
 
     def __get__(self, instance, instance_type=None):
         if instance is None:
             return self  # static access
+        slot = self.slot
+        if slot is not None:
+            try:
+                return getattr(instance, slot)
+            except AttributeError:
+                value = self.get_value(instance)
+                setattr(instance, slot, value)
+                return value
         try:
             return self.cache[instance]
         except KeyError:
@@ -44,18 +63,38 @@ class CachedDescriptor(object):
     def get_value(self, instance):
         raise NotImplementedError
 
+    def set_cached_value(self, instance, value):
+        if self.slot is None:
+            self.cache[instance] = value
+        else:
+            setattr(instance, self.slot, value)
+
+    def del_cached_value(self, instance):
+        if self.slot is None:
+            self.cache.pop(instance, None)
+        else:
+            try:
+                delattr(instance, self.slot)
+            except AttributeError:
+                pass
+
 
 class cached_property(CachedDescriptor):
 
     __slots__ = 'get', 'set', 'delete', '__doc__'
 
-    def __init__(self, fget=None, fset=None, fdel=None, doc=None):
-        super(cached_property, self).__init__()
+    def __init__(self, fget=None, fset=None, fdel=None, doc=None, slot=None):
+        super(cached_property, self).__init__(slot=slot)
         self.get = fget
         self.set = fset
         self.delete = fdel
         self.__doc__ = doc
 
+    @classmethod
+    def in_slot(cls, slot):
+        """Return decorator making property which keeps value in the slot."""
+        return functools.partial(cls, slot=slot)
+
     def get_value(self, instance):
         if self.get is None:
             raise AttributeError("unreadable attribute")
@@ -63,15 +102,15 @@ class cached_property(CachedDescriptor):
 
     def __set__(self, instance, value):
         if self.set is None:
-            self.cache[instance] = value
+            self.set_cached_value(instance, value)
         else:
             self.set(instance, value)
-            self.cache.pop(instance, None)
+            self.del_cached_value(instance)
 
     def __delete__(self, instance):
         if self.delete is not None:
             self.delete(instance)
-        self.cache.pop(instance, None)
+        self.del_cached_value(instance)
 
     def getter(self, getter):
         self.get = getter
@@ -142,9 +181,71 @@ class Lazy(object):
         return module
 
 
+class LRUCache(object):
+    """Bounded thread-safe mapping discarding least recently used items.
+
+    Args:
+        size (int): max number of items kept by cache.
+    """
+
+    __slots__ = 'size', 'hits', 'misses', '_items', '_lock'
+
+    def __init__(self, size=128):
+        self.size = size
+        self.hits = self.misses = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items[key] = value  # mark as most recently used
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+def http_date(timestamp, _cache=LRUCache(size=64)):
+    """Return HTTP-date of the timestamp (dates are cached by seconds)."""
+    seconds = int(timestamp)
+    date = _cache.get(seconds)
+    if date is None:
+        date = email.utils.formatdate(seconds, usegmt=True)
+        _cache.set(seconds, date)
+    return date
+
+
 def to_bytes(obj, encoding='utf-8', error_callback=None):
     try:
-        if isinstance(obj, (bytes, bytearray, memoryview)):
+        if isinstance(obj, bytes):
+            return obj  # immutable, no need to copy
+        if isinstance(obj, memoryview):
+            return obj.tobytes()
+        if isinstance(obj, bytearray):
             return bytes(obj)
         if obj is None:
             return b''
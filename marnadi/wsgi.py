@@ -1,17 +1,111 @@
 import collections
 import functools
-import itertools
 try:
     from urllib import parse
 except ImportError:
     import urlparse as parse
 
 from marnadi import Route, descriptors, Header
+from marnadi.descriptors.headers import RequestHeaders
 from marnadi.errors import HttpError
 from marnadi.handlers import Handler
+from marnadi.instrumentation import (
+    InstrumentedBody, InstrumentedFile, Timing, complete, timer,
+)
 from marnadi.utils import cached_property
 
 
+class Query(collections.Mapping):
+    """Query string params - lazily parsed multi-value dict-like object.
+
+    Query string is split only on first access, names and values are
+    decoded on demand. Item access returns the last value of the param,
+    all of them are returned by :meth:`getall`.
+
+    Args:
+        query_string (str): raw query string.
+    """
+
+    if hasattr(collections.Mapping, '__slots__'):
+        __slots__ = '_query_string', '_parsed_params', '_typed_params'
+
+    max_length = 65536
+
+    max_fields = 1000
+
+    def __init__(self, query_string=''):
+        self._query_string = query_string
+        self._typed_params = {}
+
+    def __getitem__(self, name):
+        return self.decode(self._params[name][-1])
+
+    def __iter__(self):
+        return iter(self._params)
+
+    def __len__(self):
+        return len(self._params)
+
+    @cached_property.in_slot('_parsed_params')
+    def _params(self):
+        query_string = self._query_string
+        if self.max_length is not None and len(query_string) > self.max_length:
+            raise HttpError('414 Request-URI Too Long')
+        fields = query_string.split('&', self.max_fields or -1)
+        if self.max_fields and len(fields) > self.max_fields:
+            raise HttpError('400 Bad Request', data="Too many query params")
+        params = {}
+        for field in fields:
+            if not field:
+                continue
+            name, _, value = field.partition('=')
+            params.setdefault(self.decode(name), []).append(value)
+        return params
+
+    @staticmethod
+    def decode(value):
+        return parse.unquote(value.replace('+', ' '))
+
+    def get(self, name, default=None, type=None):
+        """Return last value of the param converted by `type` callable.
+
+        Converted values are cached, `HttpError` with 400 status is raised
+        if conversion fails.
+        """
+        if type is None:
+            return super(Query, self).get(name, default)
+        key = name, type
+        try:
+            return self._typed_params[key]
+        except KeyError:
+            pass
+        try:
+            value = self[name]
+        except KeyError:
+            return default
+        try:
+            value = self._typed_params[key] = type(value)
+        except (TypeError, ValueError):
+            raise HttpError(
+                '400 Bad Request',
+                data="Invalid value of query param '%s'" % name,
+            )
+        return value
+
+    def getall(self, name, type=None):
+        """Return list of all values of the param."""
+        values = map(self.decode, self._params.get(name, ()))
+        if type is None:
+            return list(values)
+        try:
+            return list(map(type, values))
+        except (TypeError, ValueError):
+            raise HttpError(
+                '400 Bad Request',
+                data="Invalid value of query param '%s'" % name,
+            )
+
+
 class Request(collections.Mapping):
     """WSGI request.
 
@@ -20,7 +114,8 @@ class Request(collections.Mapping):
     """
 
     if hasattr(collections.Mapping, '__slots__'):
-        __slots__ = '_environ', '__weakref__'
+        __slots__ = ('_environ', '_content_type', '_headers', '_query',
+                     '_data', '__weakref__')
 
     __hash__ = object.__hash__
 
@@ -52,12 +147,12 @@ class Request(collections.Mapping):
     def path(self):
         return self['PATH_INFO']
 
-    @cached_property
+    @cached_property.in_slot('_content_type')
     def content_type(self):
         try:
             parts = iter(self['CONTENT_TYPE'].split(';'))
             return Header(next(parts).strip(), **dict(
-                map(str.strip, option.split('='))
+                map(str.strip, option.split('=', 1))
                 for option in parts
             ))
         except KeyError:
@@ -65,39 +160,25 @@ class Request(collections.Mapping):
 
     @property
     def content_length(self):
-        try:
-            return int(self['CONTENT_LENGTH'])
-        except KeyError:
+        """Length of request body, empty value means it's not provided."""
+        content_length = self.get('CONTENT_LENGTH', '').strip()
+        if not content_length:
             raise AttributeError("content_length is not provided")
-
-    @cached_property
+        try:
+            content_length = int(content_length)
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            raise HttpError('400 Bad Request', data="Invalid Content-Length")
+        return content_length
+
+    @cached_property.in_slot('_headers')
     def headers(self):
-        return {
-            name.title().replace('_', '-'): value
-            for name, value in
-            itertools.chain(
-                (
-                    (env_key, self[env_key])
-                    for env_key in ('CONTENT_TYPE', 'CONTENT_LENGTH')
-                    if env_key in self
-                ),
-                (
-                    (env_key[5:], env_value)
-                    for env_key, env_value in self.items()
-                    if env_key.startswith('HTTP_')
-                ),
-            )
-        }
+        return RequestHeaders(self._environ)
 
-    @cached_property
+    @cached_property.in_slot('_query')
     def query(self):
-        try:
-            return dict(parse.parse_qsl(
-                self['QUERY_STRING'],
-                keep_blank_values=True,
-            ))
-        except KeyError:
-            return {}
+        return Query(self._environ.get('QUERY_STRING', ''))
 
     data = descriptors.Data(
         (
@@ -107,11 +188,39 @@ class Request(collections.Mapping):
         (
             'application/x-www-form-urlencoded',
             'marnadi.descriptors.data.decoders' +
-            '.application.x_www_form_urlencoded.decoder',
+            '.application.x_www_form_urlencoded.Decoder',
         ),
+        (
+            'multipart/form-data',
+            'marnadi.descriptors.data.decoders.multipart.form_data.Decoder',
+        ),
+        slot='_data',
     )
 
 
+class MatchedHandler(object):
+    """Started handler coroutine returned by :meth:`App.get_handler`.
+
+    Keeps the route matched by the path, so it can be reported to
+    instrumentation collectors.
+    """
+
+    __slots__ = 'coroutine', 'route'
+
+    def __init__(self, coroutine, route):
+        self.coroutine = coroutine
+        self.route = route
+
+    def send(self, value):
+        return self.coroutine.send(value)
+
+    def throw(self, *args):
+        return self.coroutine.throw(*args)
+
+    def close(self):
+        self.coroutine.close()
+
+
 class App(object):
     """WSGI application class.
 
@@ -120,25 +229,103 @@ class App(object):
 
     Args:
         routes (iterable): list of :class:`Route`.
+        dispatcher (type): optional subclass of :class:`Dispatcher` used
+            instead of linear scan of routes, e.g. :class:`TreeDispatcher`.
+        collectors (iterable): instrumentation collectors, instances of
+            :class:`marnadi.instrumentation.Collector`.
+
+    Note:
+        Files returned by handlers are passed to `wsgi.file_wrapper` if
+        WSGI server provides it, so server may use `sendfile()` for them.
+
+        Body chunks are converted to bytes as PEP-3333 requires. Set
+        `pass_memoryview` to True if WSGI server accepts any buffer, then
+        `memoryview` chunks will be passed to it without copying.
     """
 
-    __slots__ = 'routes', 'routes_map'
+    __slots__ = 'routes', 'routes_map', 'dispatcher', 'collectors'
+
+    pass_memoryview = False
 
-    def __init__(self, routes=()):
+    def __init__(self, routes=(), dispatcher=None, collectors=()):
         self.routes_map = {}
         self.routes = self.compile_routes(routes)
+        self.dispatcher = dispatcher and dispatcher(self.routes)
+        self.collectors = tuple(collectors)
 
     def __call__(self, environ, start_response):
+        if self.collectors:
+            return self.call_instrumented(environ, start_response)
         try:
             request = self.make_request_object(environ)
             handler = self.get_handler(request.path)
             response = handler.send((self, request))
         except HttpError as error:
             response = error
+        return self.respond(environ, start_response, response)
+
+    def call_instrumented(self, environ, start_response):
+        """Same as :meth:`__call__` but notifying collectors."""
+        timing = Timing(environ, application=self)
+        collectors = self.collectors
+        for collector in collectors:
+            collector.pre_dispatch(timing)
+        try:
+            try:
+                request = self.make_request_object(environ)
+                handler = self.get_handler(request.path)
+                timing.dispatched = timer()
+                timing.route = self.get_route_name(
+                    getattr(handler, 'route', None))
+                for collector in collectors:
+                    collector.post_dispatch(timing)
+                response = handler.send((self, request))
+            except HttpError as error:
+                response = error
+            timing.first_byte = timer()
+            timing.status = response.status
+            timing.stats = getattr(response, 'stats', None)
+            for collector in collectors:
+                collector.first_byte(timing)
+            return self.respond(
+                environ, start_response, response, timing=timing)
+        except Exception:
+            complete(timing, collectors)  # body won't be returned
+            raise
+
+    @staticmethod
+    def get_route_name(route):
+        """Return name of the route used as metrics label.
+
+        Handler name is used for routes without name.
+        """
+        if route is None:  # e.g. handler returned by overridden get_handler
+            return None
+        if route.name:
+            return route.name
+        return getattr(route.handler, '_obj', route.handler).__name__
+
+    def respond(self, environ, start_response, response, timing=None):
+        """Start response and return WSGI iterable of its body.
+
+        Body notifies collectors when it's closed if `timing` is given.
+        """
         start_response(
             response.status,
             list(response.headers.items(stringify=True))
         )
+        body_file = getattr(response, 'body_file', None)
+        if body_file is not None and 'wsgi.file_wrapper' in environ:
+            response.iterator.close()
+            if timing is not None:
+                body_file = InstrumentedFile(
+                    body_file, timing, self.collectors)
+            return environ['wsgi.file_wrapper'](
+                body_file,
+                response.buffer_chunk_size,
+            )
+        if timing is not None:
+            return InstrumentedBody(response, timing, self.collectors)
         return response
 
     @staticmethod
@@ -169,6 +356,8 @@ class App(object):
             route = Route(
                 path, handler, name=name, params=params, patterns=patterns)
             self.routes.append(self.compile_route(route))
+            if self.dispatcher is not None:
+                self.dispatcher.invalidate()
             return handler
         return _decorator
 
@@ -190,6 +379,13 @@ class App(object):
             override this method by raising `HttpError` with 301 status and
             necessary 'Location' header when needed.
         """
+        route, params = self.find_route(path, routes=routes, params=params)
+        return MatchedHandler(route.handler.start(**params), route)
+
+    def find_route(self, path, routes=None, params=None):
+        """Return (route, params) tuple according to the given path."""
+        if routes is None and self.dispatcher is not None:
+            return self.dispatcher(path)
         routes = routes or self.routes
         params = params or {}
         for route in routes:
@@ -199,7 +395,7 @@ class App(object):
             rest_path, url_params = match
             if isinstance(route.handler, list):
                 try:
-                    return self.get_handler(
+                    return self.find_route(
                         rest_path,
                         routes=route.handler,
                         params=self._merge_dicts(
@@ -208,8 +404,8 @@ class App(object):
                 except HttpError:
                     continue
             if not rest_path:
-                return route.handler.start(**self._merge_dicts(
-                    params, route.params, url_params))
+                return route, self._merge_dicts(
+                    params, route.params, url_params)
         raise HttpError('404 Not Found')  # matching route not found
 
     @staticmethod
@@ -14,6 +14,7 @@ setup(
         'marnadi.descriptors.data',
         'marnadi.descriptors.data.decoders',
         'marnadi.descriptors.data.decoders.application',
+        'marnadi.descriptors.data.decoders.multipart',
     ],
     url='https://github.com/renskiy/marnadi',
     license='MIT',
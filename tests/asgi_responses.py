@@ -0,0 +1,47 @@
+"""Asynchronous helpers of ASGI tests (syntax requires Python 3.6+)."""
+
+import asyncio
+import json
+
+from marnadi import Response
+from marnadi.errors import HttpError
+
+
+class AsyncResponse(Response):
+
+    async def get(self, foo):
+        await asyncio.sleep(0)
+        return 'foo is ' + foo
+
+    async def post(self, foo):
+        return json.dumps(self.request.data)
+
+    async def delete(self, foo):
+        await asyncio.sleep(0)
+        raise HttpError('403 Forbidden')
+
+    async def put(self, foo):
+        await asyncio.sleep(0)
+        raise ValueError(foo)
+
+
+class StreamResponse(Response):
+
+    async def get(self):
+        for chunk in ('foo', b'bar'):
+            await asyncio.sleep(0)
+            yield chunk
+
+
+def make_receive(messages):
+    """Return ASGI `receive` callable returning given messages."""
+    async def receive():
+        return messages.pop(0)
+    return receive
+
+
+def make_send(sent):
+    """Return ASGI `send` callable appending messages to `sent` list."""
+    async def send(message):
+        sent.append(message)
+    return send
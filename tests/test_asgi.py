@@ -0,0 +1,155 @@
+import json
+import sys
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from marnadi import Response, Route
+from marnadi.cache import ResponseCache
+from marnadi.handlers import Handler
+from marnadi.instrumentation import Collector
+
+if sys.version_info >= (3, 6):
+    import asyncio
+
+    from marnadi.asgi import App
+    from tests.asgi_responses import (
+        AsyncResponse, StreamResponse, make_receive, make_send,
+    )
+
+
+@unittest.skipIf(sys.version_info < (3, 6), "ASGI requires Python 3.6+")
+class AppTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.routes = (
+            Route('/sync', Response.provider(lambda: 'hello')),
+            Route('/async/{foo}', AsyncResponse),
+            Route('/stream', StreamResponse),
+        )
+        self.collectors = ()
+
+    def request(self, path, method='GET', body=b'', headers=()):
+        scope = dict(
+            type='http',
+            method=method,
+            path=path,
+            query_string=b'',
+            headers=list(headers),
+        )
+        messages = [
+            dict(type='http.request', body=body[:2], more_body=True),
+            dict(type='http.request', body=body[2:]),
+        ]
+        sent = []
+        app = App(routes=self.routes, collectors=self.collectors)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(app(
+                scope, make_receive(messages), make_send(sent)))
+        finally:
+            loop.close()
+        start, body_messages = sent[0], sent[1:]
+        self.assertEqual('http.response.start', start['type'])
+        self.assertFalse(body_messages[-1].get('more_body', False))
+        body = b''.join(message['body'] for message in body_messages)
+        return start['status'], dict(start['headers']), body
+
+    def test_sync_handler(self):
+        status, headers, body = self.request('/sync')
+        self.assertEqual(200, status)
+        self.assertEqual(b'hello', body)
+        self.assertEqual(b'5', headers[b'Content-Length'])
+        self.assertEqual(
+            b'text/plain; charset=utf-8',
+            headers[b'Content-Type'],
+        )
+
+    def test_async_handler(self):
+        status, headers, body = self.request('/async/bar')
+        self.assertEqual(200, status)
+        self.assertEqual(b'foo is bar', body)
+
+    def test_async_handler__body(self):
+        status, headers, body = self.request(
+            '/async/bar',
+            method='POST',
+            body=b'{"foo": "bar"}',
+            headers=[
+                (b'content-type', b'application/json'),
+                (b'content-length', b'14'),
+            ],
+        )
+        self.assertEqual(200, status)
+        self.assertEqual({'foo': 'bar'}, json.loads(body.decode()))
+
+    def test_async_generator(self):
+        status, headers, body = self.request('/stream')
+        self.assertEqual(200, status)
+        self.assertEqual(b'foobar', body)
+        self.assertNotIn(b'Content-Length', headers)
+
+    def test_not_found(self):
+        status, headers, body = self.request('/foo')
+        self.assertEqual(404, status)
+
+    def test_not_implemented(self):
+        status, headers, body = self.request('/sync', method='FOO')
+        self.assertEqual(501, status)
+        self.assertIn(b'GET', headers[b'Allow'])
+
+    def test_error(self):
+        status, headers, body = self.request('/async/bar', method='POST')
+        self.assertEqual(500, status)
+
+    def test_async_handler__http_error(self):
+        status, headers, body = self.request('/async/bar', method='DELETE')
+        self.assertEqual(403, status)
+
+    @mock.patch.object(Handler, 'logger')
+    def test_async_handler__error(self, logger):
+        status, headers, body = self.request('/async/bar', method='PUT')
+        self.assertEqual(500, status)
+        self.assertEqual(1, logger.exception.call_count)
+
+    def test_response_cache(self):
+        get = mock.Mock(return_value='cached')
+        handler = type('MyHandler', (Response, ), dict(
+            get=lambda this: get(),
+            response_cache=ResponseCache(),
+        ))
+        self.routes = (Route('/cached', handler), )
+        for _ in range(2):
+            status, headers, body = self.request('/cached')
+            self.assertEqual(200, status)
+            self.assertEqual(b'cached', body)
+        self.assertEqual(1, get.call_count)
+
+    def test_collectors(self):
+        collector = mock.Mock(spec=Collector)
+        self.collectors = (collector, )
+        for path in '/sync', '/async/bar':
+            collector.reset_mock()
+            self.request(path)
+            self.assertEqual(
+                [
+                    'pre_dispatch', 'post_dispatch',
+                    'first_byte', 'body_complete',
+                ],
+                [call[0] for call in collector.method_calls],
+            )
+            timing = collector.body_complete.call_args[0][0]
+            self.assertEqual('200 OK', timing.status)
+            self.assertIsNotNone(timing.completed)
+        self.assertEqual('AsyncResponse', timing.route)
+        self.assertIsNone(timing.stats)
+
+    def test_collectors__not_found(self):
+        collector = mock.Mock(spec=Collector)
+        self.collectors = (collector, )
+        self.request('/missing')
+        self.assertFalse(collector.post_dispatch.called)
+        timing = collector.body_complete.call_args[0][0]
+        self.assertEqual('404 Not Found', timing.status)
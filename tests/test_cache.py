@@ -0,0 +1,216 @@
+import threading
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from marnadi import Response, Route
+from marnadi.cache import ResponseCache
+from marnadi.errors import HttpError
+from marnadi.wsgi import App
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.get = mock.Mock(return_value='hello')
+        self.cache = ResponseCache(ttl=10, size=2, vary=('Accept-Language', ))
+        timer_patcher = mock.patch.object(ResponseCache, 'timer')
+        self.timer = timer_patcher.start()
+        self.timer.return_value = 100
+        self.addCleanup(timer_patcher.stop)
+        self.handler = type('MyHandler', (Response, ), dict(
+            get=lambda this, **kwargs: self.get(**kwargs),
+            response_cache=self.cache,
+        ))
+        self.app = App(routes=(Route('/{foo}', self.handler), ))
+
+    def request(self, path='/bar', method='GET', **environ):
+        environ.update(REQUEST_METHOD=method, PATH_INFO=path)
+        start = {}
+
+        def start_response(status, headers):
+            start.update(status=status, headers=headers)
+
+        body = b''.join(self.app(environ, start_response))
+        return start['status'], start['headers'], body
+
+    def test_hit(self):
+        first = self.request()
+        second = self.request()
+        self.assertEqual(first, second)
+        self.assertEqual('200 OK', second[0])
+        self.assertIn(('Content-Length', '5'), second[1])
+        self.assertEqual(b'hello', second[2])
+        self.get.assert_called_once_with(foo='bar')
+
+    def test_key(self):
+        self.request()
+        self.request(path='/baz')
+        self.request(QUERY_STRING='a=1')
+        self.request(HTTP_ACCEPT_LANGUAGE='en')
+        self.request(HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(4, self.get.call_count)
+
+    def test_bypass(self):
+        self.request()
+        self.request(HTTP_RANGE='bytes=0-1')
+        self.request(method='POST')
+        self.assertEqual(2, self.get.call_count)
+
+    def test_ttl(self):
+        self.request()
+        self.timer.return_value = 109
+        self.request()
+        self.assertEqual(1, self.get.call_count)
+        self.timer.return_value = 110
+        self.request()
+        self.assertEqual(2, self.get.call_count)
+
+    def test_set_cookie_not_cached(self):
+        handler = type('MyHandler', (Response, ), dict(
+            get=lambda this, **kwargs: (
+                this.cookies.set('session', self.get(**kwargs)) or 'hello'),
+            response_cache=self.cache,
+        ))
+        self.app = App(routes=(Route('/{foo}', handler), ))
+        self.get.side_effect = ['alice', 'bob']
+        self.assertIn(('Set-Cookie', 'session=alice; HttpOnly'),
+                      self.request()[1])
+        self.assertIn(('Set-Cookie', 'session=bob; HttpOnly'),
+                      self.request()[1])
+        self.assertEqual(2, self.get.call_count)
+
+    def test_private_headers(self):
+        self.request(HTTP_COOKIE='session=alice')
+        self.request(HTTP_AUTHORIZATION='Basic YWxpY2U6')
+        self.assertEqual(2, self.get.call_count)
+        self.cache = ResponseCache(vary=('cookie', ))
+        self.handler.response_cache = self.cache
+        self.request(HTTP_COOKIE='session=alice')
+        self.request(HTTP_COOKIE='session=alice')
+        self.request(HTTP_COOKIE='session=bob')
+        self.assertEqual(4, self.get.call_count)
+
+    def test_compressed(self):
+        handler = type('MyHandler', (Response, ), dict(
+            get=lambda this, **kwargs: self.get(**kwargs) * 1000,
+            response_cache=self.cache,
+            compress=True,
+        ))
+        self.app = App(routes=(Route('/{foo}', handler), ))
+        status, headers, body = self.request(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn(('Content-Encoding', 'gzip'), headers)
+        status, headers, body = self.request()
+        self.assertNotIn('Content-Encoding', dict(headers))
+        self.assertEqual(b'hello' * 1000, body)
+        self.request(HTTP_ACCEPT_ENCODING='gzip')
+        self.request()
+        self.assertEqual(2, self.get.call_count)
+
+    def test_response_vary(self):
+        def get(this, **kwargs):
+            this.headers['Vary'] = 'Accept-Language, User-Agent'
+            return self.get(**kwargs)
+
+        self.handler.get = get
+        self.request(HTTP_USER_AGENT='foo')
+        self.request(HTTP_USER_AGENT='bar')
+        self.assertEqual(2, self.get.call_count)
+        self.cache.vary += ('User-Agent', )
+        self.request(HTTP_USER_AGENT='foo')
+        self.request(HTTP_USER_AGENT='foo')
+        self.assertEqual(3, self.get.call_count)
+
+    def test_server_timing_not_cached(self):
+        self.handler.server_timing = True
+        status, headers, body = self.request()
+        self.assertIn('Server-Timing', dict(headers))
+        status, headers, body = self.request()
+        self.assertEqual(1, self.get.call_count)
+        self.assertNotIn('Server-Timing', dict(headers))
+        self.assertEqual(b'hello', body)
+
+    def test_lru(self):
+        for path in ('/1', '/2', '/1', '/3', '/1', '/2'):
+            self.request(path=path)
+        self.assertEqual(4, self.get.call_count)
+
+    def test_error_not_cached(self):
+        self.get.side_effect = HttpError('404 Not Found')
+        self.assertEqual('404 Not Found', self.request()[0])
+        self.assertEqual('404 Not Found', self.request()[0])
+        self.assertEqual(2, self.get.call_count)
+
+    def test_max_body_size(self):
+        self.cache.max_body_size = 4
+        self.request()
+        self.assertEqual(b'hello', self.request()[2])
+        self.assertEqual(2, self.get.call_count)
+
+    def test_max_body_size_stream(self):
+        produced = []
+
+        def chunks():
+            for chunk in (b'foo', b'bar', b'baz', b'qux'):
+                produced.append(chunk)
+                yield chunk
+
+        self.cache.max_body_size = 5
+        self.get.side_effect = lambda **kwargs: chunks()
+        environ = dict(REQUEST_METHOD='GET', PATH_INFO='/bar')
+        result = self.app(environ, lambda status, headers: None)
+        self.assertEqual([b'foo', b'bar'], produced)  # not buffered further
+        self.assertEqual(b'foobarbazqux', b''.join(result))
+        self.assertEqual(b'foobarbazqux', self.request()[2])
+        self.assertEqual(2, self.get.call_count)
+
+    def test_max_body_size_content_length(self):
+        self.cache.max_body_size = 4
+        environ = dict(REQUEST_METHOD='GET', PATH_INFO='/bar')
+        result = self.app(environ, lambda status, headers: None)
+        self.assertIsInstance(result, self.handler)
+        self.assertEqual(b'hello', b''.join(result))
+
+    def _concurrent_test_case(self, wait_timeout):
+        self.cache.wait_timeout = wait_timeout
+        called, release = threading.Event(), threading.Event()
+
+        def get(**kwargs):
+            if not called.is_set():  # only the first call is blocked
+                called.set()
+                release.wait(5)
+            return 'hello'
+
+        self.get.side_effect = get
+        results = []
+        leader = threading.Thread(target=lambda: results.append(
+            self.request()))
+        leader.start()
+        called.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(self.request()))
+            for _ in range(3)
+        ]
+        for follower in followers:
+            follower.start()
+        return results, release, [leader] + followers
+
+    def test_single_flight(self):
+        results, release, threads = self._concurrent_test_case(5)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(4, len(results))
+        self.assertTrue(all(result[2] == b'hello' for result in results))
+        self.get.assert_called_once_with(foo='bar')
+
+    def test_single_flight_timeout(self):
+        results, release, threads = self._concurrent_test_case(0.01)
+        for thread in threads[1:]:
+            thread.join(5)
+        release.set()
+        threads[0].join(5)
+        self.assertEqual(4, len(results))
+        self.assertEqual(4, self.get.call_count)
@@ -0,0 +1,551 @@
+# -*- encoding: utf-8 -*-
+import datetime
+import io
+import unittest
+
+from marnadi import Response, Header, descriptors
+from marnadi.descriptors.cookies import RequestCookies
+from marnadi.descriptors.data.decoders import Decoder
+from marnadi.descriptors.data.decoders.application.json import StreamDecoder
+from marnadi.descriptors.data.decoders.multipart import form_data
+from marnadi.errors import HttpError
+from marnadi.wsgi import Request
+
+
+class _HeadersTestClass(object):
+
+    headers = descriptors.Headers(
+        ('Content-Type', Header('text/plain', charset='utf-8')),
+        ('X-Foo', 'foo'),
+    )
+
+
+class HeadersTestCase(unittest.TestCase):
+
+    def test_items__defaults(self):
+        headers = _HeadersTestClass().headers
+        self.assertListEqual(
+            [
+                ('Content-Type', 'text/plain; charset=utf-8'),
+                ('X-Foo', 'foo'),
+            ],
+            sorted(headers.items(stringify=True)),
+        )
+
+    def test_items__changed(self):
+        headers = _HeadersTestClass().headers
+        headers['x-foo'] = 'bar'
+        headers.append('X-Bar', 1)
+        self.assertListEqual(
+            [
+                ('Content-Type', 'text/plain; charset=utf-8'),
+                ('X-Bar', '1'),
+                ('X-Foo', 'bar'),
+            ],
+            sorted(headers.items(stringify=True)),
+        )
+
+    def test_changes_not_shared(self):
+        headers = _HeadersTestClass().headers
+        headers.append('X-Foo', 'bar')
+        headers.setdefault('X-Bar', 'bar')
+        del headers['Content-Type']
+        self.assertListEqual(['foo', 'bar'], headers['X-Foo'])
+        self.assertListEqual(
+            [
+                ('Content-Type', 'text/plain; charset=utf-8'),
+                ('X-Foo', 'foo'),
+            ],
+            sorted(_HeadersTestClass().headers.items(stringify=True)),
+        )
+
+    def test_clear(self):
+        headers = _HeadersTestClass().headers
+        headers.clear()
+        self.assertListEqual([], list(headers.items(stringify=True)))
+        self.assertEqual(2, len(_HeadersTestClass().headers))
+
+    def test_defaults_read_only(self):
+        headers = _HeadersTestClass().headers
+        self.assertTupleEqual(('foo', ), headers['X-Foo'])
+
+    def test_changes(self):
+        headers = _HeadersTestClass().headers
+        del headers['X-Foo']
+        headers['X-Bar'] = 'bar'
+        self.assertListEqual(['Content-Type', 'X-Bar'], sorted(headers))
+        self.assertEqual(2, len(headers))
+        self.assertRaises(KeyError, headers.__getitem__, 'X-Foo')
+        self.assertRaises(KeyError, headers.__delitem__, 'X-Foo')
+        headers.append('X-Foo', 'baz')
+        self.assertListEqual(['baz'], headers['X-Foo'])
+
+    def test_clear__append(self):
+        headers = _HeadersTestClass().headers
+        headers.clear()
+        headers.append('Content-Type', 'text/html')
+        self.assertListEqual(
+            [('Content-Type', 'text/html')],
+            list(headers.items(stringify=True)),
+        )
+
+    def test_getitem__missing(self):
+        headers = _HeadersTestClass().headers
+        self.assertIsNone(headers.get('X-Bar'))
+        self.assertNotIn('X-Bar', headers)
+
+
+class RequestCookiesTestCase(unittest.TestCase):
+
+    def test_lazy_lookup(self):
+        cookies = RequestCookies('foo=1; bar=2; baz=3')
+        self.assertEqual('2', cookies['bar'])
+        self.assertEqual({'foo': '1', 'bar': '2'}, cookies._cookies)
+        self.assertEqual('3', cookies['baz'])
+        self.assertRaises(KeyError, cookies.__getitem__, 'qux')
+        self.assertEqual({'foo': '1', 'bar': '2', 'baz': '3'}, dict(cookies))
+
+    def test_malformed(self):
+        cookies = RequestCookies(';foo=1;; bar ; =2;baz = "3"; qux=a=b;x=""')
+        self.assertEqual(
+            {'foo': '1', 'baz': '3', 'qux': 'a=b', 'x': ''},
+            dict(cookies),
+        )
+
+    def test_repeated(self):
+        cookies = RequestCookies('foo=1; foo=2')
+        self.assertEqual('1', cookies['foo'])
+        self.assertEqual(1, len(cookies))
+
+    def test_empty(self):
+        cookies = RequestCookies()
+        self.assertEqual({}, dict(cookies))
+        self.assertIsNone(cookies.get('foo'))
+
+    def test_mutation(self):
+        cookies = RequestCookies('foo=1; bar=2')
+        cookies['baz'] = '3'
+        del cookies['foo']
+        self.assertEqual({'bar': '2', 'baz': '3'}, dict(cookies))
+
+    def test_cookie_jar(self):
+        response = Response(None, Request(dict(HTTP_COOKIE='foo=bar')))
+        self.assertEqual('bar', response.cookies['foo'])
+        response.cookies['foo'] = 'baz'
+        self.assertEqual('baz', response.cookies['foo'])
+        self.assertIn(
+            ('Set-Cookie', 'foo=baz; HttpOnly'),
+            list(response.headers.items(stringify=True)),
+        )
+        response = Response(None, Request({}))
+        self.assertEqual({}, dict(response.cookies))
+
+
+class _CookiesTestResponse(Response):
+
+    cookies = descriptors.Cookies(domain='example.com', path='/', secure=True)
+
+
+class CookieJarTestCase(unittest.TestCase):
+
+    def set_cookie(self, *args, **kwargs):
+        response = _CookiesTestResponse(None, Request({}))
+        response.cookies.set(*args, **kwargs)
+        return response.headers['Set-Cookie']
+
+    def test_set__defaults(self):
+        self.assertEqual(
+            ['foo=bar; Domain=example.com; Path=/; Secure; HttpOnly'],
+            self.set_cookie('foo', 'bar'),
+        )
+
+    def test_set__overridden(self):
+        self.assertEqual(
+            ['foo=bar; Domain=example.com; Path=/foo'],
+            self.set_cookie(
+                'foo', 'bar', path='/foo', secure=False, http_only=False),
+        )
+
+    def test_set__expires(self):
+        expires = datetime.datetime(2015, 10, 21, 7, 28, tzinfo=_UTC())
+        self.assertEqual(
+            [
+                'foo=bar; Expires=Wed, 21 Oct 2015 07:28:00 GMT; '
+                'Domain=example.com; Path=/; Secure; HttpOnly'
+            ],
+            self.set_cookie('foo', 'bar', expires=expires),
+        )
+        self.assertEqual(
+            [
+                'foo=bar; Expires=Thu, 01 Jan 1970 00:00:00 GMT; '
+                'Domain=example.com; Path=/; Secure; HttpOnly'
+            ],
+            self.set_cookie(
+                'foo', 'bar', expires='Thu, 01 Jan 1970 00:00:00 GMT'),
+        )
+
+    def test_set__changed_jar(self):
+        response = _CookiesTestResponse(None, Request({}))
+        response.cookies.domain = None
+        response.cookies.set('foo', 'bar')
+        self.assertEqual(
+            ['foo=bar; Path=/; Secure; HttpOnly'],
+            response.headers['Set-Cookie'],
+        )
+
+
+class _UTC(datetime.tzinfo):
+
+    def utcoffset(self, dt):
+        return datetime.timedelta(0)
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+    def tzname(self, dt):
+        return 'UTC'
+
+
+class _ReadOnlyStream(object):
+
+    def __init__(self, body):
+        self.stream = io.BytesIO(body)
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+
+class _SmallChunksDecoder(Decoder):
+
+    __slots__ = ()
+
+    chunk_size = 3
+
+
+class _LimitedDecoder(Decoder):
+
+    __slots__ = ()
+
+    chunk_size = 3
+
+    max_size = 5
+
+
+class _UnlimitedDecoder(Decoder):
+
+    __slots__ = ()
+
+    max_size = None
+
+
+class _SmallChunksStreamDecoder(StreamDecoder):
+
+    __slots__ = ()
+
+    chunk_size = 3
+
+
+class _DecoderTestCase(unittest.TestCase):
+
+    content_type = 'application/json'
+
+    def make_request(self, body, content_length=True, stream=io.BytesIO):
+        environ = {
+            'wsgi.input': stream(body),
+            'CONTENT_TYPE': self.content_type,
+        }
+        if content_length:
+            environ['CONTENT_LENGTH'] = str(len(body))
+        return Request(environ)
+
+
+class DecoderTestCase(_DecoderTestCase):
+
+    content_type = 'application/octet-stream'
+
+    def test_read_body(self):
+        for stream in io.BytesIO, _ReadOnlyStream:
+            request = self.make_request(b'foobar', stream=stream)
+            self.assertEqual(b'foobar', _SmallChunksDecoder(request))
+
+    def test_read_body__content_length(self):
+        for stream in io.BytesIO, _ReadOnlyStream:
+            request = self.make_request(b'foobar', stream=stream)
+            request._environ['CONTENT_LENGTH'] = '4'
+            self.assertEqual(b'foob', _SmallChunksDecoder(request))
+
+    def test_read_body__short_input(self):
+        request = self.make_request(b'foo')
+        request._environ['CONTENT_LENGTH'] = '6'
+        self.assertEqual(b'foo', _SmallChunksDecoder(request))
+
+    def test_read_body__huge_content_length(self):
+        request = self.make_request(b'foo')
+        request._environ['CONTENT_LENGTH'] = str(10 ** 13)
+        with self.assertRaises(HttpError) as context:
+            Decoder(request)
+        self.assertEqual(
+            '413 Request Entity Too Large',
+            context.exception.status,
+        )
+        request = self.make_request(b'foo')
+        request._environ['CONTENT_LENGTH'] = str(10 ** 13)
+        self.assertEqual(b'foo', _UnlimitedDecoder(request))
+
+    def test_read_body__no_content_length(self):
+        request = self.make_request(b'foobar', content_length=False)
+        self.assertEqual(b'foobar', _SmallChunksDecoder(request))
+
+    def test_read_body__empty_content_length(self):
+        request = self.make_request(b'foobar')
+        request._environ['CONTENT_LENGTH'] = ''
+        self.assertEqual(b'foobar', _SmallChunksDecoder(request))
+
+    def test_read_body__invalid_content_length(self):
+        for content_length in 'foo', '-1':
+            request = self.make_request(b'foobar')
+            request._environ['CONTENT_LENGTH'] = content_length
+            with self.assertRaises(HttpError) as context:
+                _SmallChunksDecoder(request)
+            self.assertEqual('400 Bad Request', context.exception.status)
+
+    def test_read_body__too_large(self):
+        for content_length in True, False:
+            request = self.make_request(b'foobar', content_length)
+            with self.assertRaises(HttpError) as context:
+                _LimitedDecoder(request)
+            self.assertEqual(
+                '413 Request Entity Too Large',
+                context.exception.status,
+            )
+
+    def test_request_data__form(self):
+        request = self.make_request(b'foo=bar&baz=')
+        request._environ['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+        self.assertDictEqual({b'foo': b'bar', b'baz': b''}, request.data)
+
+    def test_request_data__json(self):
+        request = self.make_request(b'{"foo": "bar"}')
+        request._environ['CONTENT_TYPE'] = 'application/json; charset=utf-8'
+        self.assertDictEqual({'foo': 'bar'}, request.data)
+
+
+class StreamDecoderTestCase(_DecoderTestCase):
+
+    def test_items(self):
+        body = b' [1, "foo", {"bar": [true, null]}, 12.5, "\xd1\x84"] '
+        for decoder in StreamDecoder, _SmallChunksStreamDecoder:
+            self.assertListEqual(
+                [1, 'foo', {'bar': [True, None]}, 12.5, u'ф'],
+                list(decoder(self.make_request(body))),
+            )
+
+    def test_items__chunk_boundaries(self):
+        for body, expected in (
+            (b'[12.5]', [12.5]),
+            (b'[1.5e3]', [1500.0]),
+            (b'[-1.25E-2, 3e+2, 0, -7]', [-0.0125, 300.0, 0, -7]),
+            (b'[true,"1.5",12]', [True, '1.5', 12]),
+        ):
+            for chunk_size in range(1, len(body) + 1):
+                decoder = type('Decoder', (StreamDecoder, ), dict(
+                    __slots__=(),
+                    chunk_size=chunk_size,
+                ))
+                for content_length in True, False:
+                    request = self.make_request(body, content_length)
+                    self.assertListEqual(
+                        expected,
+                        list(decoder(request)),
+                        'body %r, chunk size %d' % (body, chunk_size),
+                    )
+
+    def test_items__malformed_number(self):
+        for chunk_size in 1, 2, 3, 64:
+            decoder = type('Decoder', (StreamDecoder, ), dict(
+                __slots__=(),
+                chunk_size=chunk_size,
+            ))
+            request = self.make_request(b'[12.x]')
+            self.assertRaises(ValueError, list, decoder(request))
+
+    def test_items__no_content_length(self):
+        request = self.make_request(b'[123, 4]', content_length=False)
+        items = _SmallChunksStreamDecoder(request)
+        self.assertListEqual([123, 4], list(items))
+
+    def test_items__content_length(self):
+        request = self.make_request(b'[1, 2]garbage')
+        request._environ['CONTENT_LENGTH'] = '6'
+        self.assertListEqual([1, 2], list(_SmallChunksStreamDecoder(request)))
+
+    def test_items__empty(self):
+        request = self.make_request(b'[ ]')
+        self.assertListEqual([], list(_SmallChunksStreamDecoder(request)))
+
+    def test_items__lazy(self):
+        items = _SmallChunksStreamDecoder(self.make_request(b'[1, 2, }'))
+        self.assertEqual(1, next(items))
+        self.assertEqual(2, next(items))
+        self.assertRaises(ValueError, next, items)
+
+    def test_items__unexpected_end(self):
+        items = _SmallChunksStreamDecoder(self.make_request(b'[1, 2'))
+        self.assertRaises(ValueError, list, items)
+
+    def test_items__not_array(self):
+        items = StreamDecoder(self.make_request(b'{}'))
+        self.assertRaises(ValueError, list, items)
+
+    def test_response_data(self):
+        class MyResponse(Response):
+
+            data = descriptors.Data(
+                ('application/json', StreamDecoder),
+            )
+
+        response = MyResponse(None, self.make_request(b'[1, 2]'))
+        self.assertListEqual([1, 2], list(response.data))
+
+
+class _SmallChunksMultipartDecoder(form_data.Decoder):
+
+    __slots__ = ()
+
+    chunk_size = 5
+
+    spool_size = 4
+
+    max_field_size = 10
+
+
+class MultipartDecoderTestCase(_DecoderTestCase):
+
+    content_type = 'multipart/form-data; boundary="b=1"'
+
+    body = (
+        b'preamble\r\n'
+        b'--b=1\r\n'
+        b'Content-Disposition: form-data; name="foo"\r\n'
+        b'\r\n'
+        b'bar\r\n--b=\r\n'
+        b'--b=1\r\n'
+        b'Content-Disposition: form-data; name="file"; '
+        b'filename="a;b.txt"\r\n'
+        b'Content-Type: text/plain\r\n'
+        b'\r\n'
+        b'file content\r\n'
+        b'--b=1\r\n'
+        b'Content-Disposition: form-data; name="empty"\r\n'
+        b'\r\n'
+        b'\r\n'
+        b'--b=1--\r\n'
+        b'epilogue'
+    )
+
+    def test_parse(self):
+        for decoder in form_data.Decoder, _SmallChunksMultipartDecoder:
+            data = decoder(self.make_request(self.body))
+            self.addCleanup(data.close)
+            self.assertListEqual(['empty', 'file', 'foo'], sorted(data))
+            self.assertEqual(b'bar\r\n--b=', data['foo'])
+            self.assertEqual(b'', data['empty'])
+            file_part = data['file']
+            self.assertIsInstance(file_part, form_data.FilePart)
+            self.assertEqual('a;b.txt', file_part.filename)
+            self.assertEqual('text/plain', file_part.content_type)
+            self.assertEqual(12, file_part.size)
+            self.assertEqual(b'file content', file_part.file.read())
+
+    def test_parse__multiple_values(self):
+        body = (
+            b'--b=1\r\n'
+            b'Content-Disposition: form-data; name="files"; '
+            b'filename="a.txt"\r\n'
+            b'\r\n'
+            b'foo\r\n'
+            b'--b=1\r\n'
+            b'Content-Disposition: form-data; name="files"; '
+            b'filename="b.txt"\r\n'
+            b'\r\n'
+            b'barbaz\r\n'
+            b'--b=1--\r\n'
+        )
+        for decoder in form_data.Decoder, _SmallChunksMultipartDecoder:
+            data = decoder(self.make_request(body))
+            self.assertIsInstance(data, form_data.FormData)
+            self.assertListEqual(['files'], list(data))
+            files = data.getall('files')
+            self.assertListEqual(
+                ['a.txt', 'b.txt'],
+                [file_part.filename for file_part in files],
+            )
+            self.assertEqual(b'foo', files[0].file.read())
+            self.assertEqual(b'barbaz', files[1].file.read())
+            self.assertIs(files[-1], data['files'])
+            self.assertListEqual([], data.getall('missing'))
+            data.close()
+            for file_part in files:
+                self.assertTrue(file_part.file.closed)
+
+    def test_parse__error_closes_files(self):
+        parts = []
+
+        class Decoder(form_data.Decoder):
+
+            __slots__ = ()
+
+            max_file_size = 5
+
+            def make_part(self, raw_headers):
+                part = super(Decoder, self).make_part(raw_headers)
+                parts.append(part)
+                return part
+
+        body = (
+            b'--b=1\r\n'
+            b'Content-Disposition: form-data; name="a"; filename="a"\r\n'
+            b'\r\n'
+            b'foo\r\n'
+            b'--b=1\r\n'
+            b'Content-Disposition: form-data; name="b"; filename="b"\r\n'
+            b'\r\n'
+            b'too large\r\n'
+            b'--b=1--\r\n'
+        )
+        with self.assertRaises(HttpError) as context:
+            Decoder(self.make_request(body))
+        self.assertEqual(
+            '413 Request Entity Too Large',
+            context.exception.status,
+        )
+        self.assertEqual(2, len(parts))
+        for file_part in parts:
+            self.assertTrue(file_part.file.closed)
+
+    def test_request_data(self):
+        data = self.make_request(self.body).data
+        self.addCleanup(data.close)
+        self.assertEqual(b'bar\r\n--b=', data['foo'])
+
+    def test_parse__field_too_large(self):
+        body = self.body.replace(b'\r\n\r\nbar', b'\r\n\r\nbar' * 5)
+        with self.assertRaises(HttpError) as context:
+            _SmallChunksMultipartDecoder(self.make_request(body))
+        self.assertEqual(
+            '413 Request Entity Too Large',
+            context.exception.status,
+        )
+
+    def test_parse__unexpected_end(self):
+        body = self.body[:-len(b'--\r\nepilogue')]
+        with self.assertRaises(HttpError) as context:
+            _SmallChunksMultipartDecoder(self.make_request(body))
+        self.assertEqual('400 Bad Request', context.exception.status)
+
+    def test_parse__no_boundary(self):
+        request = self.make_request(self.body)
+        request._environ['CONTENT_TYPE'] = 'multipart/form-data'
+        with self.assertRaises(HttpError) as context:
+            form_data.Decoder(request)
+        self.assertEqual('400 Bad Request', context.exception.status)
@@ -1,6 +1,14 @@
+import array
+import tempfile
 import unittest
+import zlib
+try:
+    from unittest import mock
+except ImportError:
+    import mock
 
-from marnadi import Response, Route
+from marnadi import Response, Route, Header
+from marnadi.descriptors import Headers
 from marnadi.wsgi import Request, App
 
 
@@ -62,3 +70,420 @@ class HandlerTestCase(unittest.TestCase):
                 ('Content-Type', 'text/plain; charset=utf-8'),
             ),
         )
+
+    def test_handler__generator(self):
+        MyResponse = type('MyHandler', (Response, ), dict(
+            get=lambda *args: (chunk for chunk in ('foo', b'bar'))
+        ))
+        routes = (
+            Route('/', MyResponse),
+        )
+        environ = Request(dict(
+            REQUEST_METHOD='GET',
+            PATH_INFO='/',
+        ))
+        self.handler_parametrized_test_case(
+            routes=routes,
+            environ=environ,
+            expected_result=b'foobar',
+        )
+
+    def test_handler__buffer(self):
+        MyResponse = type('MyHandler', (Response, ), dict(
+            get=lambda *args: bytearray(b'foobarbaz'),
+            buffer_chunk_size=4,
+        ))
+        app = App(routes=(Route('/', MyResponse), ))
+        environ = Request(dict(
+            REQUEST_METHOD='GET',
+            PATH_INFO='/',
+        ))
+        chunks = list(app(environ, lambda status, headers: None))
+        self.assertListEqual([b'foob', b'arba', b'z'], chunks)
+        self.assertTrue(all(isinstance(chunk, bytes) for chunk in chunks))
+
+    def test_handler__buffer_pass_memoryview(self):
+        MyResponse = type('MyHandler', (Response, ), dict(
+            get=lambda *args: memoryview(b'foobarbaz'),
+            buffer_chunk_size=4,
+        ))
+        MyApp = type('MyApp', (App, ), dict(
+            __slots__=(),
+            pass_memoryview=True,
+        ))
+        routes = (
+            Route('/', MyResponse),
+        )
+        environ = Request(dict(
+            REQUEST_METHOD='GET',
+            PATH_INFO='/',
+        ))
+        headers = []
+        chunks = list(MyApp(routes=routes)(
+            environ, lambda status, response_headers: headers.extend(
+                response_headers)))
+        self.assertIn(('Content-Length', '9'), headers)
+        self.assertTrue(all(isinstance(chunk, memoryview) for chunk in chunks))
+        self.assertEqual(
+            b'foobarbaz',
+            b''.join(chunk.tobytes() for chunk in chunks),
+        )
+
+    @unittest.skipUnless(
+        hasattr(memoryview, 'cast'),
+        "arrays don't provide buffers for memoryview on python 2.x",
+    )
+    def test_handler__buffer_multibyte_items(self):
+        buffer = array.array('H', [1, 2, 3])
+        MyResponse = type('MyHandler', (Response, ), dict(
+            get=lambda *args: memoryview(buffer),
+            buffer_chunk_size=4,
+        ))
+        app = App(routes=(Route('/', MyResponse), ))
+        environ = Request(dict(
+            REQUEST_METHOD='GET',
+            PATH_INFO='/',
+        ))
+        headers = []
+        chunks = list(app(
+            environ, lambda status, response_headers: headers.extend(
+                response_headers)))
+        self.assertIn(('Content-Length', '6'), headers)
+        self.assertEqual(buffer.tobytes(), b''.join(chunks))
+
+    def _file_test_case(self, content, environ=None, buffer_chunk_size=4):
+        body_file = tempfile.TemporaryFile()
+        body_file.write(content)
+        body_file.seek(1)
+        MyResponse = type('MyHandler', (Response, ), dict(
+            get=lambda *args: body_file,
+            buffer_chunk_size=buffer_chunk_size,
+        ))
+        app = App(routes=(Route('/', MyResponse), ))
+        environ = Request(dict(
+            environ or {},
+            REQUEST_METHOD='GET',
+            PATH_INFO='/',
+        ))
+        headers = []
+        result = app(environ, lambda status, response_headers: headers.extend(
+            response_headers))
+        return body_file, result, headers
+
+    def test_handler__file(self):
+        body_file, result, headers = self._file_test_case(b'foobarbaz')
+        self.assertIn(('Content-Length', '8'), headers)
+        chunks = list(result)
+        self.assertListEqual([b'', b'ooba', b'rbaz'], chunks)
+        self.assertTrue(body_file.closed)
+
+    def test_handler__file_empty(self):
+        body_file, result, headers = self._file_test_case(b'')
+        self.assertIn(('Content-Length', '0'), headers)
+        self.assertEqual(b'', b''.join(result))
+        self.assertTrue(body_file.closed)
+
+    def test_handler__file_wrapper(self):
+        file_wrapper = mock.Mock()
+        body_file, result, headers = self._file_test_case(
+            b'foobarbaz',
+            environ={'wsgi.file_wrapper': file_wrapper},
+        )
+        self.assertIn(('Content-Length', '8'), headers)
+        self.assertIs(file_wrapper.return_value, result)
+        file_wrapper.assert_called_once_with(body_file, 4)
+        self.assertFalse(body_file.closed)
+        self.assertEqual(b'oobarbaz', body_file.read())
+        body_file.close()
+
+    def _range_test_case(self, body, range_header, method='GET'):
+        MyResponse = type('MyHandler', (Response, ), dict(
+            get=lambda *args: body,
+            post=lambda *args: body,
+            buffer_chunk_size=4,
+        ))
+        app = App(routes=(Route('/', MyResponse), ))
+        environ = Request(dict(
+            REQUEST_METHOD=method,
+            PATH_INFO='/',
+            HTTP_RANGE=range_header,
+        ))
+        start = {}
+
+        def start_response(status, headers):
+            start.update(status=status, headers=headers)
+
+        result = b''.join(app(environ, start_response))
+        return start['status'], start['headers'], result
+
+    def test_handler__range(self):
+        status, headers, result = self._range_test_case(
+            bytearray(b'foobarbaz'), 'bytes=2-5')
+        self.assertEqual('206 Partial Content', status)
+        self.assertIn(('Content-Range', 'bytes 2-5/9'), headers)
+        self.assertIn(('Content-Length', '4'), headers)
+        self.assertIn(('Accept-Ranges', 'bytes'), headers)
+        self.assertEqual(b'obar', result)
+        self.assertEqual('200 OK', Response.status)
+
+    def test_handler__range_suffix(self):
+        status, headers, result = self._range_test_case(
+            bytearray(b'foobarbaz'), 'bytes=-4')
+        self.assertEqual('206 Partial Content', status)
+        self.assertIn(('Content-Range', 'bytes 5-8/9'), headers)
+        self.assertEqual(b'rbaz', result)
+
+    def test_handler__range_open_end(self):
+        status, headers, result = self._range_test_case(
+            bytearray(b'foobarbaz'), 'bytes=6-100')
+        self.assertEqual('206 Partial Content', status)
+        self.assertIn(('Content-Range', 'bytes 6-8/9'), headers)
+        self.assertEqual(b'baz', result)
+
+    def test_handler__range_multiple(self):
+        status, headers, result = self._range_test_case(
+            bytearray(b'foobarbaz'), 'bytes=0-2,6-')
+        self.assertEqual('206 Partial Content', status)
+        headers = dict(headers)
+        content_type = headers['Content-Type']
+        self.assertTrue(content_type.startswith('multipart/byteranges'))
+        boundary = content_type.split('boundary=', 1)[1]
+        self.assertEqual(
+            (
+                '\r\n--{0}\r\n'
+                'Content-Type: text/plain; charset=utf-8\r\n'
+                'Content-Range: bytes 0-2/9\r\n\r\n'
+                'foo'
+                '\r\n--{0}\r\n'
+                'Content-Type: text/plain; charset=utf-8\r\n'
+                'Content-Range: bytes 6-8/9\r\n\r\n'
+                'baz'
+                '\r\n--{0}--\r\n'
+            ).format(boundary).encode(),
+            result,
+        )
+        self.assertEqual(str(len(result)), headers['Content-Length'])
+
+    def test_handler__range_not_satisfiable(self):
+        status, headers, result = self._range_test_case(
+            bytearray(b'foobarbaz'), 'bytes=9-')
+        self.assertEqual('416 Requested Range Not Satisfiable', status)
+        self.assertIn(('Content-Range', 'bytes */9'), headers)
+
+    def test_handler__range_invalid(self):
+        for range_header in ('bytes=5-2', 'bytes=foo', 'items=0-1'):
+            status, headers, result = self._range_test_case(
+                bytearray(b'foobarbaz'), range_header)
+            self.assertEqual('200 OK', status)
+            self.assertEqual(b'foobarbaz', result)
+
+    def test_handler__range_ignored_for_post(self):
+        status, headers, result = self._range_test_case(
+            bytearray(b'foobarbaz'), 'bytes=2-5', method='POST')
+        self.assertEqual('200 OK', status)
+        self.assertEqual(b'foobarbaz', result)
+
+    def test_handler__range_ignored_for_error(self):
+        def get(this):
+            this.status = '404 Not Found'
+            return bytearray(b'not found')
+
+        MyResponse = type('MyHandler', (Response, ), dict(get=get))
+        app = App(routes=(Route('/', MyResponse), ))
+        environ = Request(dict(
+            REQUEST_METHOD='GET',
+            PATH_INFO='/',
+            HTTP_RANGE='bytes=2-5',
+        ))
+        start = {}
+
+        def start_response(status, headers):
+            start.update(status=status, headers=headers)
+
+        result = b''.join(app(environ, start_response))
+        self.assertEqual('404 Not Found', start['status'])
+        self.assertNotIn('Content-Range', dict(start['headers']))
+        self.assertEqual(b'not found', result)
+
+    def test_handler__file_range(self):
+        file_wrapper = mock.Mock()
+        body_file, result, headers = self._file_test_case(
+            b'foobarbaz',
+            environ={
+                'HTTP_RANGE': 'bytes=1-2,-2',
+                'wsgi.file_wrapper': file_wrapper,
+            },
+        )
+        self.assertFalse(file_wrapper.called)
+        result = b''.join(result)
+        self.assertIn(b'\r\n\r\nob\r\n', result)
+        self.assertIn(b'\r\n\r\naz\r\n', result)
+        self.assertIn(('Content-Length', str(len(result))), headers)
+        self.assertTrue(body_file.closed)
+
+    def _conditional_test_case(self, environ, **attributes):
+        attributes.setdefault('get', lambda *args: 'hello')
+        MyResponse = type('MyHandler', (Response, ), attributes)
+        app = App(routes=(Route('/', MyResponse), ))
+        environ = Request(dict(environ, REQUEST_METHOD='GET', PATH_INFO='/'))
+        start = {}
+
+        def start_response(status, headers):
+            start.update(status=status, headers=headers)
+
+        result = b''.join(app(environ, start_response))
+        return start['status'], start['headers'], result
+
+    def test_handler__etag_not_modified(self):
+        get = mock.Mock(return_value='hello')
+        status, headers, result = self._conditional_test_case(
+            dict(HTTP_IF_NONE_MATCH='"v0", W/"v1"'),
+            get=get,
+            get_etag=lambda *args, **kwargs: 'v1',
+        )
+        self.assertEqual('304 Not Modified', status)
+        self.assertIn(('Etag', '"v1"'), headers)
+        self.assertNotIn('Content-Length', dict(headers))
+        self.assertNotIn('Content-Type', dict(headers))
+        self.assertEqual(b'', result)
+        self.assertFalse(get.called)
+
+    def test_handler__etag_modified(self):
+        status, headers, result = self._conditional_test_case(
+            dict(HTTP_IF_NONE_MATCH='"v0"'),
+            get_etag=lambda *args, **kwargs: 'v1',
+        )
+        self.assertEqual('200 OK', status)
+        self.assertIn(('Etag', '"v1"'), headers)
+        self.assertEqual(b'hello', result)
+
+    def test_handler__last_modified(self):
+        cases = (
+            ('Sun, 06 Nov 1994 08:49:37 GMT', '304 Not Modified', b''),
+            ('Sun, 06 Nov 1994 08:49:36 GMT', '200 OK', b'hello'),
+            ('invalid date', '200 OK', b'hello'),
+        )
+        for if_modified_since, expected_status, expected_result in cases:
+            status, headers, result = self._conditional_test_case(
+                dict(HTTP_IF_MODIFIED_SINCE=if_modified_since),
+                get_last_modified=lambda *args, **kwargs: 784111777,
+            )
+            self.assertEqual(expected_status, status)
+            self.assertIn(
+                ('Last-Modified', 'Sun, 06 Nov 1994 08:49:37 GMT'),
+                headers,
+            )
+            self.assertEqual(expected_result, result)
+
+    def test_handler__auto_etag(self):
+        status, headers, result = self._conditional_test_case(
+            {}, auto_etag=True)
+        self.assertEqual('200 OK', status)
+        etag = dict(headers)['Etag']
+        status, headers, result = self._conditional_test_case(
+            dict(HTTP_IF_NONE_MATCH=etag), auto_etag=True)
+        self.assertEqual('304 Not Modified', status)
+        self.assertEqual(b'', result)
+
+    def test_handler__if_range(self):
+        for if_range, expected_status in (
+            ('"v1"', '206 Partial Content'),
+            ('"v0"', '200 OK'),
+        ):
+            status, headers, result = self._conditional_test_case(
+                dict(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=if_range),
+                get=lambda *args: bytearray(b'hello'),
+                get_etag=lambda *args, **kwargs: 'v1',
+            )
+            self.assertEqual(expected_status, status)
+
+    def _compress_test_case(
+        self,
+        body,
+        accept_encoding,
+        environ=None,
+        **attributes
+    ):
+        attributes.setdefault('compress', True)
+        attributes.setdefault('compress_min_size', 4)
+        return self._conditional_test_case(
+            dict(environ or {}, HTTP_ACCEPT_ENCODING=accept_encoding),
+            get=lambda *args: body,
+            **attributes
+        )
+
+    def test_handler__compress_gzip(self):
+        status, headers, result = self._compress_test_case(
+            'hello' * 100, 'deflate;q=0.5, gzip')
+        headers = dict(headers)
+        self.assertEqual('gzip', headers['Content-Encoding'])
+        self.assertEqual('Accept-Encoding', headers['Vary'])
+        self.assertEqual(str(len(result)), headers['Content-Length'])
+        self.assertEqual(
+            b'hello' * 100,
+            zlib.decompress(result, 16 + zlib.MAX_WBITS),
+        )
+
+    def test_handler__compress_deflate_stream(self):
+        status, headers, result = self._compress_test_case(
+            (chunk for chunk in ('hello', 'world') * 100),
+            'gzip;q=0, *',
+        )
+        headers = dict(headers)
+        self.assertEqual('deflate', headers['Content-Encoding'])
+        self.assertNotIn('Content-Length', headers)
+        self.assertEqual(b'helloworld' * 100, zlib.decompress(result))
+
+    def test_handler__compress_skipped(self):
+        cases = (
+            ('hello', 'gzip', {'compress_min_size': 1024}),
+            ('hello', 'identity', {}),
+            ('hello', 'gzip', {'compress': False}),
+            (
+                'hello', 'gzip',
+                {'headers': Headers(('Content-Type', Header('image/png')))},
+            ),
+        )
+        for body, accept_encoding, attributes in cases:
+            status, headers, result = self._compress_test_case(
+                body, accept_encoding, **attributes)
+            self.assertNotIn('Content-Encoding', dict(headers))
+            self.assertIn(('Content-Length', '5'), headers)
+            self.assertEqual(b'hello', result)
+
+    def test_handler__compress_etag(self):
+        for attributes in (
+            {'auto_etag': True},
+            {'get_etag': lambda *args, **kwargs: 'foo'},
+        ):
+            status, headers, result = self._compress_test_case(
+                'hello' * 100, 'gzip', **attributes)
+            gzip_etag = dict(headers)['Etag']
+            status, headers, result = self._compress_test_case(
+                'hello' * 100, 'identity', **attributes)
+            identity_etag = dict(headers)['Etag']
+            self.assertEqual('W/' + identity_etag, gzip_etag)
+            status, headers, result = self._compress_test_case(
+                'hello' * 100, 'gzip',
+                environ={'HTTP_IF_NONE_MATCH': gzip_etag},
+                **attributes
+            )
+            self.assertEqual('304 Not Modified', status)
+
+    def test_handler__compress_file(self):
+        file_wrapper = mock.Mock()
+        body_file = tempfile.TemporaryFile()
+        body_file.write(b'hello' * 100)
+        body_file.seek(0)
+        status, headers, result = self._compress_test_case(
+            body_file,
+            'gzip',
+            environ={'wsgi.file_wrapper': file_wrapper},
+            buffer_chunk_size=64,
+        )
+        self.assertFalse(file_wrapper.called)
+        self.assertNotIn('Content-Length', dict(headers))
+        self.assertEqual(
+            b'hello' * 100,
+            zlib.decompress(result, 16 + zlib.MAX_WBITS),
+        )
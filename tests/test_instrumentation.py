@@ -0,0 +1,204 @@
+import re
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from marnadi import Response, Route
+from marnadi.errors import HttpError
+from marnadi.instrumentation import Collector, Histogram, HistogramCollector
+from marnadi.wsgi import App
+
+
+class HistogramTestCase(unittest.TestCase):
+
+    def test_percentile(self):
+        histogram = Histogram(bounds=(1, 2, 4, 8))
+        for value in (0.5, 1.5, 1.5, 3, 7):
+            histogram.add(value)
+        self.assertEqual(5, histogram.count)
+        self.assertEqual(1, histogram.percentile(20))
+        self.assertEqual(2, histogram.percentile(50))
+        self.assertEqual(4, histogram.percentile(80))
+        self.assertEqual(7, histogram.percentile(100))
+
+    def test_percentile_overflow(self):
+        histogram = Histogram(bounds=(1, ))
+        histogram.add(5)
+        self.assertEqual(5, histogram.percentile(99))
+
+    def test_percentile_empty(self):
+        self.assertEqual(0, Histogram().percentile(50))
+
+
+class InstrumentationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.collector = mock.Mock(spec=Collector)
+        self.histograms = HistogramCollector()
+        self.app = App(
+            routes=(
+                Route('/foo', Response.provider(lambda: 'foo'), name='foo'),
+                Route('/bar', Response.provider(lambda: 'bar')),
+            ),
+            collectors=(self.collector, self.histograms),
+        )
+
+    def request(self, path):
+        environ = dict(REQUEST_METHOD='GET', PATH_INFO=path)
+        result = self.app(environ, lambda status, headers: None)
+        body = b''.join(result)
+        result.close()
+        return body
+
+    def test_hooks(self):
+        self.assertEqual(b'foo', self.request('/foo'))
+        self.assertEqual(
+            ['pre_dispatch', 'post_dispatch', 'first_byte', 'body_complete'],
+            [call[0] for call in self.collector.method_calls],
+        )
+        timing = self.collector.body_complete.call_args[0][0]
+        self.assertEqual('foo', timing.route)
+        self.assertEqual('200 OK', timing.status)
+        self.assertTrue(
+            timing.started <= timing.dispatched <= timing.first_byte <=
+            timing.completed
+        )
+
+    def test_route_name_fallback(self):
+        self.request('/bar')
+        timing = self.collector.body_complete.call_args[0][0]
+        self.assertEqual('<lambda>', timing.route)
+
+    def test_route_name_shared_handler(self):
+        handler = Response.provider(lambda **kwargs: 'foo')
+        self.app = App(
+            routes=(
+                Route('/a/{foo}', handler, name='a'),
+                Route('/b/{foo}/{bar}', handler, name='b'),
+            ),
+            collectors=(self.collector, ),
+        )
+        for path, route in (('/b/1/2', 'b'), ('/a/1', 'a')):
+            self.request(path)
+            timing = self.collector.post_dispatch.call_args[0][0]
+            self.assertEqual(route, timing.route)
+
+    def test_get_handler_override(self):
+        class RedirectingApp(App):
+
+            __slots__ = ()
+
+            def get_handler(self, path, routes=None, params=None):
+                if not path.endswith('/'):
+                    raise HttpError(
+                        '301 Moved Permanently',
+                        headers=(('Location', path + '/'), ),
+                    )
+                return super(RedirectingApp, self).get_handler(
+                    path, routes=routes, params=params)
+
+        self.app = RedirectingApp(
+            routes=(Route('/foo/', Response.provider(lambda: 'foo'),
+                          name='foo'), ),
+            collectors=(self.collector, ),
+        )
+        self.request('/foo')
+        timing = self.collector.body_complete.call_args[0][0]
+        self.assertEqual('301 Moved Permanently', timing.status)
+        self.assertEqual(b'foo', self.request('/foo/'))
+        timing = self.collector.body_complete.call_args[0][0]
+        self.assertEqual('foo', timing.route)
+
+    def test_not_found(self):
+        self.request('/baz')
+        self.assertFalse(self.collector.post_dispatch.called)
+        timing = self.collector.body_complete.call_args[0][0]
+        self.assertIsNone(timing.route)
+        self.assertIsNone(timing.dispatched)
+        self.assertEqual('404 Not Found', timing.status)
+
+    def test_export(self):
+        self.request('/foo')
+        self.request('/foo')
+        self.request('/baz')
+        stats = self.histograms.export(percents=(50, 99))
+        self.assertEqual({'foo', None}, set(stats))
+        self.assertEqual(
+            {
+                'dispatch', 'first_byte', 'total',
+                'handler', 'first_chunk', 'stream',
+            },
+            set(stats['foo']),
+        )
+        self.assertEqual({'first_byte', 'total'}, set(stats[None]))
+        total = stats['foo']['total']
+        self.assertEqual(2, total['count'])
+        self.assertLessEqual(total['p50'], total['p99'])
+        self.assertLessEqual(total['p99'], total['max'])
+
+    def test_response_stats(self):
+        self.app = App(
+            routes=(Route('/', Response.provider(
+                lambda: (chunk for chunk in (b'foo', b'', b'barbaz'))
+            )), ),
+            collectors=(self.collector, ),
+        )
+        self.assertEqual(b'foobarbaz', self.request('/'))
+        stats = self.collector.body_complete.call_args[0][0].stats
+        self.assertEqual(3, stats.chunks)
+        self.assertEqual(9, stats.bytes_sent)
+        self.assertGreaterEqual(stats.handler_time, 0)
+        self.assertGreaterEqual(stats.first_chunk_time, 0)
+        self.assertGreaterEqual(stats.stream_time, 0)
+
+    def test_server_timing(self):
+        handler = type('MyHandler', (Response, ), dict(
+            get=lambda this: 'foo',
+            server_timing=True,
+        ))
+        app = App(routes=(Route('/', handler), ))
+        environ = dict(REQUEST_METHOD='GET', PATH_INFO='/')
+        headers = []
+        result = app(environ, lambda status, response_headers: headers.extend(
+            response_headers))
+        self.assertEqual(b'foo', b''.join(result))
+        self.assertTrue(re.match(
+            r'^handler;dur=[0-9.]+, first-chunk;dur=[0-9.]+$',
+            dict(headers)['Server-Timing'],
+        ))
+        self.assertEqual(1, result.stats.chunks)
+
+    def test_file_wrapper(self):
+        body_file = tempfile.TemporaryFile()
+        self.addCleanup(body_file.close)
+        body_file.write(b'foo')
+        body_file.seek(0)
+        self.app = App(
+            routes=(Route('/', Response.provider(lambda: body_file)), ),
+            collectors=(self.collector, ),
+        )
+        file_wrapper = mock.Mock()
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': '/',
+            'wsgi.file_wrapper': file_wrapper,
+        }
+        result = self.app(environ, lambda status, headers: None)
+        self.assertIs(file_wrapper.return_value, result)
+        wrapped_file = file_wrapper.call_args[0][0]
+        self.assertEqual(body_file.fileno(), wrapped_file.fileno())
+        self.assertEqual(b'foo', wrapped_file.read())
+        self.assertFalse(self.collector.body_complete.called)
+        wrapped_file.close()
+        self.assertTrue(body_file.closed)
+        self.assertEqual(1, self.collector.body_complete.call_count)
+
+    def test_no_collectors(self):
+        app = App(routes=(Route('/', Response.provider(lambda: 'foo')), ))
+        environ = dict(REQUEST_METHOD='GET', PATH_INFO='/')
+        response = app(environ, lambda status, headers: None)
+        self.assertIsInstance(response, Response)
+        self.assertFalse(hasattr(response, 'stats'))
@@ -0,0 +1,130 @@
+import cProfile
+import gc
+import os
+import pstats
+import shutil
+import tempfile
+import time
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from marnadi import Response, Route
+from marnadi.profiling import Profiler
+from marnadi.wsgi import App
+
+
+def slow_handler():
+    time.sleep(0.05)
+    return 'slow'
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def make_app(self, **kwargs):
+        self.profiler = Profiler(**kwargs)
+        return App(
+            routes=(
+                Route('/slow', Response.provider(slow_handler), name='slow'),
+                Route('/fast', Response.provider(lambda: 'fast')),
+            ),
+            collectors=(self.profiler, ),
+        )
+
+    def request(self, app, path, **environ):
+        environ.update(REQUEST_METHOD='GET', PATH_INFO=path)
+        result = app(environ, lambda status, headers: None)
+        body = b''.join(result)
+        result.close()
+        return body
+
+    def test_not_profiled(self):
+        app = self.make_app(header='X-Profile', routes=('slow', ))
+        self.assertEqual(b'fast', self.request(app, '/fast'))
+        self.assertEqual(0, self.profiler.requests)
+        self.assertIsNone(self.profiler.stats)
+
+    def test_header(self):
+        app = self.make_app(header='X-Profile')
+        self.request(app, '/fast', HTTP_X_PROFILE='1')
+        self.assertEqual(1, self.profiler.requests)
+
+    def test_route(self):
+        app = self.make_app(routes=('slow', ))
+        self.request(app, '/slow')
+        self.request(app, '/missing')
+        self.assertEqual(1, self.profiler.requests)
+
+    def test_route__single_dispatch(self):
+        app = self.make_app(routes=('slow', ), interval=None)
+        with mock.patch.object(
+            App, 'find_route', autospec=True, side_effect=App.find_route,
+        ) as find_route:
+            self.request(app, '/slow')
+        self.assertEqual(1, find_route.call_count)
+        self.assertEqual(1, self.profiler.requests)
+
+    def test_respond_error(self):
+        app = self.make_app(routes=('slow', ), interval=None)
+
+        def start_response(status, headers):
+            raise RuntimeError
+
+        environ = dict(REQUEST_METHOD='GET', PATH_INFO='/slow')
+        self.assertRaises(RuntimeError, app, environ, start_response)
+        self.assertEqual(1, self.profiler.requests)
+        self.request(app, '/slow')
+        self.assertEqual(2, self.profiler.requests)
+
+    def test_enable_error(self):
+        app = self.make_app(routes=('slow', ), interval=None)
+        with mock.patch.object(cProfile, 'Profile') as profile:
+            profile.return_value.enable.side_effect = ValueError
+            self.assertRaises(ValueError, self.request, app, '/slow')
+        self.assertIsNone(self.profiler._current)
+        self.request(app, '/slow')
+        self.assertEqual(1, self.profiler.requests)
+
+    def test_body_not_closed(self):
+        app = self.make_app(routes=('slow', ), interval=None)
+        environ = dict(REQUEST_METHOD='GET', PATH_INFO='/slow')
+        result = app(environ, lambda status, headers: None)
+        self.assertEqual(b'slow', b''.join(result))
+        del result
+        gc.collect()
+        self.assertEqual(1, self.profiler.requests)
+        self.request(app, '/slow')
+        self.assertEqual(2, self.profiler.requests)
+
+    def test_sample_rate(self):
+        app = self.make_app(sample_rate=1)
+        self.request(app, '/fast')
+        self.request(app, '/fast')
+        self.assertEqual(2, self.profiler.requests)
+
+    def test_dump_stats(self):
+        app = self.make_app(routes=('slow', ), interval=None)
+        self.assertRaises(ValueError, self.profiler.dump_stats, 'stats')
+        self.request(app, '/slow')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'stats')
+        self.profiler.dump_stats(path)
+        functions = [
+            function_name
+            for filename, line, function_name in pstats.Stats(path).stats
+        ]
+        self.assertIn('slow_handler', functions)
+
+    def test_collapsed_stacks(self):
+        app = self.make_app(routes=('slow', ), interval=0.001)
+        self.request(app, '/slow')
+        stacks = self.profiler.collapsed_stacks()
+        self.assertIn(__name__ + ':slow_handler ', stacks)
+        for line in stacks.splitlines():
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+        self.profiler.clear()
+        self.assertEqual('', self.profiler.collapsed_stacks())
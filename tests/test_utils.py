@@ -2,7 +2,9 @@
 import types
 import unittest
 
-from marnadi.utils import Lazy
+from marnadi.utils import (
+    Lazy, LRUCache, cached_property, http_date, to_bytes,
+)
 
 try:
     str = unicode
@@ -146,3 +148,99 @@ class LazyTestCase(unittest.TestCase):
         lazy = Lazy('marnadi.descriptors')
         self.assertIsInstance(lazy, types.ModuleType)
         self.assertEqual('marnadi.descriptors', lazy.__name__)
+
+
+class LRUCacheTestCase(unittest.TestCase):
+
+    def test_get__missing(self):
+        cache = LRUCache()
+        self.assertIsNone(cache.get('foo'))
+        self.assertEqual(1, cache.misses)
+
+    def test_get(self):
+        cache = LRUCache()
+        cache.set('foo', 'bar')
+        self.assertEqual('bar', cache.get('foo'))
+        self.assertEqual(1, cache.hits)
+
+    def test_set__eviction(self):
+        cache = LRUCache(size=2)
+        cache.set('foo', 1)
+        cache.set('bar', 2)
+        cache.get('foo')
+        cache.set('baz', 3)
+        self.assertIn('foo', cache)
+        self.assertNotIn('bar', cache)
+        self.assertIn('baz', cache)
+        self.assertEqual(2, len(cache))
+
+    def test_clear(self):
+        cache = LRUCache()
+        cache.set('foo', 'bar')
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+
+class _SlottedTestClass(object):
+
+    __slots__ = '_foo', 'calls'
+
+    def __init__(self):
+        self.calls = 0
+
+    @cached_property.in_slot('_foo')
+    def foo(self):
+        self.calls += 1
+        return 'foo'
+
+
+class CachedPropertyTestCase(unittest.TestCase):
+
+    def test_slot__get(self):
+        instance = _SlottedTestClass()
+        self.assertEqual('foo', instance.foo)
+        self.assertEqual('foo', instance.foo)
+        self.assertEqual('foo', instance._foo)
+        self.assertEqual(1, instance.calls)
+
+    def test_slot__set(self):
+        instance = _SlottedTestClass()
+        instance.foo = 'bar'
+        self.assertEqual('bar', instance.foo)
+        self.assertEqual(0, instance.calls)
+
+    def test_slot__delete(self):
+        instance = _SlottedTestClass()
+        self.assertEqual('foo', instance.foo)
+        del instance.foo
+        del instance.foo
+        self.assertEqual('foo', instance.foo)
+        self.assertEqual(2, instance.calls)
+
+
+class ToBytesTestCase(unittest.TestCase):
+
+    def test_bytes(self):
+        self.assertIs(_test_bytes, to_bytes(_test_bytes))
+
+    def test_buffers(self):
+        for buffer in bytearray(b'foo'), memoryview(b'foo'):
+            self.assertEqual(b'foo', to_bytes(buffer))
+            self.assertIsInstance(to_bytes(buffer), bytes)
+
+    def test_str(self):
+        self.assertEqual(b'foo', to_bytes(_test_str))
+
+    def test_none(self):
+        self.assertEqual(b'', to_bytes(None))
+
+
+class HttpDateTestCase(unittest.TestCase):
+
+    def test_http_date(self):
+        self.assertEqual('Thu, 01 Jan 1970 00:00:00 GMT', http_date(0))
+        self.assertEqual(
+            'Sun, 06 Nov 1994 08:49:37 GMT',
+            http_date(784111777.9),
+        )
+        self.assertIs(http_date(784111777.9), http_date(784111777))
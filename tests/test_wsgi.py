@@ -5,8 +5,9 @@ except ImportError:
     import mock
 
 from marnadi import Route, Response
+from marnadi.dispatchers import TreeDispatcher, RegexDispatcher
 from marnadi.errors import HttpError
-from marnadi.wsgi import App
+from marnadi.wsgi import App, Request, Query
 
 _test_handler = Response
 
@@ -16,8 +17,87 @@ _test_handler_seq_routes = (
 )
 
 
+class RequestTestCase(unittest.TestCase):
+
+    def test_headers__get(self):
+        request = Request(dict(
+            HTTP_COOKIE='foo=bar',
+            CONTENT_TYPE='text/html',
+        ))
+        self.assertEqual('foo=bar', request.headers['Cookie'])
+        self.assertEqual('foo=bar', request.headers['cookie'])
+        self.assertEqual('text/html', request.headers['Content-Type'])
+
+    def test_headers__get_uncommon(self):
+        request = Request(dict(HTTP_X_FOO_BAR='baz'))
+        self.assertEqual('baz', request.headers['X-Foo-Bar'])
+        self.assertIsNone(request.headers.get('X-Foo'))
+        self.assertNotIn('X-Foo', request.headers)
+
+    def test_headers__iter(self):
+        request = Request(dict(
+            HTTP_X_FOO='foo',
+            CONTENT_LENGTH='3',
+            PATH_INFO='/',
+        ))
+        self.assertDictEqual(
+            {'X-Foo': 'foo', 'Content-Length': '3'},
+            dict(request.headers),
+        )
+        self.assertEqual(2, len(request.headers))
+
+
+class QueryTestCase(unittest.TestCase):
+
+    def test_getitem(self):
+        query = Query('foo=bar&baz=1&foo=b%20a+z&empty')
+        self.assertEqual('b a z', query['foo'])
+        self.assertEqual('', query['empty'])
+        self.assertDictEqual(
+            {'foo': 'b a z', 'baz': '1', 'empty': ''},
+            dict(query),
+        )
+
+    def test_getall(self):
+        query = Query('foo=bar&baz=1&foo=baz')
+        self.assertListEqual(['bar', 'baz'], query.getall('foo'))
+        self.assertListEqual([1], query.getall('baz', type=int))
+        self.assertListEqual([], query.getall('missing'))
+
+    def test_get__type(self):
+        query = Query('foo=1')
+        self.assertEqual(1, query.get('foo', type=int))
+        self.assertEqual(1, query.get('foo', type=int))
+        self.assertIsNone(query.get('bar', type=int))
+
+    def test_get__type_error(self):
+        query = Query('foo=bar')
+        with self.assertRaises(HttpError) as context:
+            query.get('foo', type=int)
+        self.assertEqual('400 Bad Request', context.exception.status)
+
+    def test_max_fields(self):
+        query = Query('&'.join(['foo=bar'] * (Query.max_fields + 1)))
+        with self.assertRaises(HttpError) as context:
+            len(query)
+        self.assertEqual('400 Bad Request', context.exception.status)
+
+    def test_max_length(self):
+        query = Query('foo=' + 'a' * Query.max_length)
+        with self.assertRaises(HttpError) as context:
+            query.get('foo')
+        self.assertEqual('414 Request-URI Too Long', context.exception.status)
+
+    def test_request_query(self):
+        request = Request(dict(QUERY_STRING='foo=bar'))
+        self.assertEqual('bar', request.query['foo'])
+        self.assertDictEqual({}, dict(Request({}).query))
+
+
 class AppTestCase(unittest.TestCase):
 
+    dispatcher = None
+
     @Response.provider
     def expected_handler(self, *args, **kwargs):
         pass
@@ -40,7 +120,7 @@ class AppTestCase(unittest.TestCase):
             self.assertDictEqual(expected_kwargs or {}, kwargs)
 
         expected.side_effect = side_effect
-        app = App(routes=routes)
+        app = App(routes=routes, dispatcher=self.dispatcher)
         app.get_handler(requested_path)
         self.assertEqual(1, expected.call_count)
         self.assertEqual(0, unexpected.call_count)
@@ -588,6 +668,42 @@ class AppTestCase(unittest.TestCase):
             )
         self.assertEqual('404 Not Found', context.exception.status)
 
+    def test_get_handler__patterns(self):
+        self._get_handler_parametrized_test_case(
+            routes=(
+                Route('/{foo}', self.unexpected_handler,
+                      patterns=dict(foo=r'\d+')),
+                Route('/{foo}', self.expected_handler,
+                      patterns=dict(foo=r'[a-z.]+')),
+            ),
+            requested_path='/foo.bar',
+            expected_kwargs=dict(foo='foo.bar'),
+        )
+
+    def test_get_handler__lazy_pattern(self):
+        self._get_handler_parametrized_test_case(
+            routes=(
+                Route('/{foo}', self.unexpected_handler,
+                      patterns=dict(foo=r'\w+?')),
+                Route('/{foo}', self.expected_handler),
+            ),
+            requested_path='/foo',
+            expected_kwargs=dict(foo='foo'),
+        )
+
+    def test_get_handler__same_placeholders(self):
+        self._get_handler_parametrized_test_case(
+            routes=(
+                Route('/{foo}/', (
+                    Route('{bar}', self.unexpected_handler,
+                          patterns=dict(bar=r'\d+')),
+                )),
+                Route('/{foo}/{bar}', self.expected_handler),
+            ),
+            requested_path='/foo/bar',
+            expected_kwargs=dict(foo='foo', bar='bar'),
+        )
+
     def test_compile_routes__empty(self):
         app = App()
         self.assertListEqual([], app.routes)
@@ -640,7 +756,7 @@ class AppTestCase(unittest.TestCase):
             )
 
         mocked.side_effect = side_effect
-        app = App()
+        app = App(dispatcher=self.dispatcher)
         app.route('/{foo}', params=dict(kwarg='kwarg'))(Response)
         app.get_handler('/foo')
         self.assertEqual(1, mocked.call_count)
@@ -655,10 +771,128 @@ class AppTestCase(unittest.TestCase):
             )
 
         mocked.side_effect = side_effect
-        app = App()
+        app = App(dispatcher=self.dispatcher)
         routes = (
             Route('/{bar}', Response, params=dict(kwarg2='kwarg2', kwarg=2)),
         )
         app.route('/{foo}', params=dict(kwarg1='kwarg1', kwarg=1))(routes)
         app.get_handler('/foo/bar')
         self.assertEqual(1, mocked.call_count)
+
+
+class TreeDispatcherAppTestCase(AppTestCase):
+
+    dispatcher = TreeDispatcher
+
+    @mock.patch.object(Response, 'start')
+    def test_route__after_dispatch(self, mocked):
+        app = App(dispatcher=self.dispatcher)
+        with self.assertRaises(HttpError):
+            app.get_handler('/foo')
+        app.route('/foo')(Response)
+        app.get_handler('/foo')
+        self.assertEqual(1, mocked.call_count)
+
+    def test_get_handler__shared_prefix(self):
+        self._get_handler_parametrized_test_case(
+            routes=(
+                Route('/foo/bar', self.unexpected_handler),
+                Route('/foo/{baz}', self.expected_handler),
+                Route('/foo/baz', self.unexpected_handler),
+                Route('/fo', self.unexpected_handler),
+            ),
+            requested_path='/foo/baz',
+            expected_kwargs=dict(baz='baz'),
+        )
+
+    def test_get_handler__escaped_braces(self):
+        self._get_handler_parametrized_test_case(
+            routes=(
+                Route('/{{foo}}/{bar}', self.expected_handler),
+            ),
+            requested_path='/{foo}/bar',
+            expected_kwargs=dict(bar='bar'),
+        )
+
+    def test_get_handler__backtracking_placeholder(self):
+        self._get_handler_parametrized_test_case(
+            routes=(
+                Route(
+                    '/{foo}',
+                    self.unexpected_handler,
+                    patterns=dict(foo='a|ab'),
+                ),
+                Route('/{bar}', self.expected_handler),
+            ),
+            requested_path='/ab',
+            expected_kwargs=dict(bar='ab'),
+        )
+
+    def test_get_handler__many_routes(self):
+        routes = [
+            Route('/items%d/{item_id}' % index, self.unexpected_handler)
+            for index in range(250)
+        ]
+        routes.append(
+            Route('/items1/{item_id}/{extra}', self.expected_handler))
+        self._get_handler_parametrized_test_case(
+            routes=routes,
+            requested_path='/items1/foo/bar',
+            expected_kwargs=dict(item_id='foo', extra='bar'),
+        )
+
+
+class RegexDispatcherAppTestCase(TreeDispatcherAppTestCase):
+
+    dispatcher = RegexDispatcher
+
+    def test_alternation__groups_limit(self):
+        routes = [
+            Route('/items%d/{item_id}/{{x}}/{name}' % index, Response)
+            for index in range(200)
+        ]
+        alternation = self.dispatcher(routes).compiled_routes
+        patterns = alternation.make_patterns()
+        self.assertGreater(len(patterns), 1)
+        for pattern, indexes in patterns:
+            self.assertLessEqual(pattern.groups, alternation.max_groups)
+        self.assertEqual(199, alternation.match('/items199/foo/{x}/bar'))
+        self.assertEqual(12, alternation.match('/items12/foo/{x}/bar'))
+        self.assertIsNone(alternation.match('/items200/foo/{x}/bar'))
+
+
+class CachedTreeDispatcher(TreeDispatcher):
+
+    __slots__ = ()
+
+    cache_size = 2
+
+
+class CachedDispatcherAppTestCase(TreeDispatcherAppTestCase):
+
+    dispatcher = CachedTreeDispatcher
+
+    @mock.patch.object(Response, 'start')
+    def test_get_handler__cache(self, mocked):
+        app = App(
+            routes=(Route('/{foo}', Response), ),
+            dispatcher=self.dispatcher,
+        )
+        for path in ('/foo', '/foo', '/bar', '/', '/foo', '/bar'):
+            try:
+                app.get_handler(path)
+            except HttpError:
+                pass
+        mocked.assert_called_with(foo='bar')
+        self.assertEqual(5, mocked.call_count)
+        self.assertEqual(1, app.dispatcher.cache.hits)
+        self.assertEqual(5, app.dispatcher.cache.misses)
+        self.assertEqual(2, len(app.dispatcher.cache))
+
+    def test_get_handler__cache_not_found(self):
+        app = App(dispatcher=self.dispatcher)
+        for _ in range(2):
+            with self.assertRaises(HttpError) as context:
+                app.get_handler('/foo')
+            self.assertEqual('404 Not Found', context.exception.status)
+        self.assertEqual(1, app.dispatcher.cache.hits)